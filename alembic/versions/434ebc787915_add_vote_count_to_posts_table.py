@@ -0,0 +1,42 @@
+"""add vote count to posts table
+
+Revision ID: 434ebc787915
+Revises: 63ee09b198a1
+Create Date: 2026-10-18 16:07:03.775447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "434ebc787915"
+down_revision: Union[str, None] = "63ee09b198a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "posts",
+        sa.Column(
+            "vote_count", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+    )
+    # ? Backfill the counter from the votes already cast
+    op.execute(
+        """
+        UPDATE posts
+        SET vote_count = counted.n_votes
+        FROM (
+            SELECT post_id, COUNT(*) AS n_votes FROM votes GROUP BY post_id
+        ) AS counted
+        WHERE posts.id = counted.post_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "vote_count")
@@ -0,0 +1,34 @@
+"""add trigram index on posts title
+
+Revision ID: 658c3b961b45
+Revises: 434ebc787915
+Create Date: 2026-10-18 16:08:37.934668
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "658c3b961b45"
+down_revision: Union[str, None] = "434ebc787915"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_posts_title_trgm",
+        "posts",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_posts_title_trgm", table_name="posts")
@@ -0,0 +1,35 @@
+"""add version to posts and users
+
+Revision ID: 9d41c7e2a5b8
+Revises: 658c3b961b45
+Create Date: 2026-10-18 16:52:11.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d41c7e2a5b8"
+down_revision: Union[str, None] = "658c3b961b45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ? Constant server default -> no table rewrite, existing rows start at 1
+    op.add_column(
+        "posts",
+        sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+    op.add_column(
+        "users",
+        sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "version")
+    op.drop_column("posts", "version")
@@ -1,10 +1,12 @@
 """ Auth APIs """
 from fastapi import APIRouter, Depends
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.db_config import get_db
+from app.database.db_config import get_session
 from app.exceptions.http_exceptions import (
     InternalServerErrorException,
+    ServiceUnavailableException,
     UnauthorizedException,
 )
 from app.schemas.token_schemas import Token
@@ -15,19 +17,22 @@ router = APIRouter(prefix="/login", tags=["Authentication"])
 
 
 @router.post("", response_model=Token)
-def login(
+async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
 ):
     """Login User"""
     try:
-        token = oauth2_service.login_user(user_credentials, db_session)
+        token = await oauth2_service.login_user(user_credentials, db_session)
 
         return token
 
     except UnauthorizedException as exc_401:
         print(exc_401)
         raise exc_401
+    except ServiceUnavailableException as exc_503:
+        print(exc_503)
+        raise exc_503
     except InternalServerErrorException as exc_500:
         print(exc_500)
         raise exc_500
@@ -0,0 +1,89 @@
+""" Metrics APIs """
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.database.db_config import AsyncEngine, AsyncReadEngine, Engine, ReadEngine
+from app.monitoring.metrics_registry import Family, metrics
+from app.monitoring.pool_instrumentation import pool_stats_collector
+from app.services import posts_service, users_service
+from app.utils.password_utils import password_pool_stats
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+def app_stats_collector() -> dict[str, Family]:
+    """Exposes the caches and bcrypt pool stats as Prometheus families"""
+    caches = {
+        "user": users_service.user_cache,
+        "post": posts_service.post_cache,
+    }
+    cache_stats = {name: cache.stats() for name, cache in caches.items()}
+    pool_stats = password_pool_stats()
+
+    return {
+        # ? Hit ratio = rate(hits) / (rate(hits) + rate(misses)), computed by
+        # ? Prometheus: per worker ratio gauges couldn't be summed
+        "cache_hits_total": {
+            "type": "counter",
+            "help": "Cache hits of this process",
+            "samples": {
+                f'cache_hits_total{{cache="{name}"}}': stats["hits"]
+                for name, stats in cache_stats.items()
+            },
+        },
+        "cache_misses_total": {
+            "type": "counter",
+            "help": "Cache misses of this process",
+            "samples": {
+                f'cache_misses_total{{cache="{name}"}}': stats["misses"]
+                for name, stats in cache_stats.items()
+            },
+        },
+        "cache_size": {
+            "type": "gauge",
+            "help": "Entries currently cached",
+            "samples": {
+                f'cache_size{{cache="{name}"}}': stats["size"]
+                for name, stats in cache_stats.items()
+                # ? Remote caches don't know their size
+                if stats["size"] is not None
+            },
+        },
+        "password_pool_in_flight": {
+            "type": "gauge",
+            "help": "bcrypt jobs running in the process pool",
+            "samples": {"password_pool_in_flight": pool_stats["in_flight"]},
+        },
+        "password_pool_queued": {
+            "type": "gauge",
+            "help": "bcrypt jobs waiting for a free process",
+            "samples": {"password_pool_queued": pool_stats["queued"]},
+        },
+        "password_pool_rejected_total": {
+            "type": "counter",
+            "help": "bcrypt jobs rejected with 503 because the queue was full",
+            "samples": {"password_pool_rejected_total": pool_stats["rejected"]},
+        },
+    }
+
+
+metrics.register_collector(app_stats_collector)
+# ? dict.fromkeys -> replica engines only show up when they are not the primary ones
+DB_ENGINES = tuple(
+    dict.fromkeys(
+        (
+            Engine,
+            AsyncEngine.sync_engine,
+            ReadEngine,
+            AsyncReadEngine.sync_engine,
+        )
+    )
+)
+metrics.register_collector(lambda: pool_stats_collector(*DB_ENGINES))
+
+
+@router.get("", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,51 +1,98 @@
 """ Posts APIs """
-from fastapi import APIRouter, Depends, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.db_config import get_db
+from app.database.db_config import get_session, run_in_session
+from app.database.db_routing import get_read_session, stick_to_primary
 from app.schemas.users_schemas import UserOut
-from app.schemas.posts_schemas import PostOut, PostUpsert
+from app.schemas.posts_schemas import PostExportFormat, PostOut, PostUpsert
 from app.services import posts_service
 from app.exceptions.http_exceptions import (
+    BadRequestException,
     UnauthorizedException,
     ForbiddenException,
     NotFoundException,
     InternalServerErrorException,
 )
 from app.authentication import oauth2_service
+from app.utils.cursor_utils import NEXT_CURSOR_HEADER
+from app.utils.ids_utils import MAX_IDS_PER_REQUEST, parse_ids
+from app.utils.etag_utils import ETAG_HEADER, etag_matches, not_modified_response
+from app.utils.json_utils import json_response
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
+EXPORT_MEDIA_TYPES = {
+    PostExportFormat.NDJSON: "application/x-ndjson",
+    PostExportFormat.CSV: "text/csv",
+}
+
 
 # 5 GET
 
 
 @router.get("", response_model=list[PostOut])
-def get_posts(
+async def get_posts(
     skip: int = 0,
     limit: int = 100,
     search: str = "",
-    db_session: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="Comma separated post ids"),
+    if_none_match: Optional[str] = Header(None),
+    db_session: Session | AsyncSession = Depends(get_read_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
-    """Get Posts"""
+    """Get Posts, pass the X-Next-Cursor header back as cursor to get the next page.
+    With ids, get just those posts (the ones that exist) in a single query"""
     try:
-        posts = posts_service.get_posts_with_n_votes(db_session, skip, limit, search)
+        if ids is not None:
+            post_ids = parse_ids(ids, MAX_IDS_PER_REQUEST)
+            posts = await run_in_session(
+                db_session, posts_service.get_posts_by_ids_with_n_votes, post_ids
+            )
+            etag = posts_service.posts_etag(posts)
+            if etag_matches(if_none_match, etag):
+                return not_modified_response(etag)
+
+            return json_response(
+                [post.model_dump() for post in posts], {ETAG_HEADER: etag}
+            )
+
+        posts, next_cursor, etag = await posts_service.get_posts_with_n_votes_coalesced(
+            db_session,
+            skip,
+            limit,
+            search,
+            cursor,
+            if_none_match,
+        )
+        if posts is None:
+            return not_modified_response(etag)
+
+        headers = {ETAG_HEADER: etag}
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
 
-        return posts
+        return json_response(posts, headers)
 
+    except BadRequestException as exc_400:
+        print(exc_400)
+        raise exc_400
     except Exception as exc_500:
         print(exc_500)
         raise InternalServerErrorException(exc_500) from exc_500
 
 
 @router.get("/latest", response_model=PostOut)
-def get_latest_post(
-    db_session: Session = Depends(get_db),
+async def get_latest_post(
+    db_session: Session | AsyncSession = Depends(get_read_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Get Latest Post"""
     try:
-        post = posts_service.get_latest_post_with_n_votes(db_session)
+        post = await posts_service.get_latest_post_with_n_votes_coalesced(db_session)
         return post
 
     except NotFoundException as exc_404:
@@ -56,18 +103,52 @@ def get_latest_post(
         raise InternalServerErrorException(exc_500) from exc_500
 
 
-#! If you change the order of this 2 GET requests ⬆⬇, you'll get an error!
+@router.get("/export", response_class=StreamingResponse)
+async def export_posts(
+    export_format: PostExportFormat = Query(PostExportFormat.NDJSON, alias="format"),
+    db_session: Session | AsyncSession = Depends(get_read_session),
+    current_user: UserOut = Depends(oauth2_service.get_current_user),
+):
+    """Export every Post with its number of votes, streamed as NDJSON or CSV"""
+    try:
+        chunks = posts_service.export_posts_with_n_votes(db_session, export_format)
+
+        return StreamingResponse(
+            chunks,
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers={
+                "Content-Disposition": f"attachment; filename=posts.{export_format.value}"
+            },
+        )
+
+    except Exception as exc_500:
+        print(exc_500)
+        raise InternalServerErrorException(exc_500) from exc_500
+
+
+#! If you change the order of these GET requests ⬆⬇, you'll get an error!
 
 
 @router.get("/{post_id}", response_model=PostOut)
-def get_post(
+async def get_post(
     post_id: int,
-    db_session: Session = Depends(get_db),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db_session: Session | AsyncSession = Depends(get_read_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
-    """Get Post"""
+    """Get Post, 304 when If-None-Match has its current ETag"""
     try:
-        post = posts_service.get_post_by_id_with_n_votes(db_session, post_id)
+        post, etag = await run_in_session(
+            db_session,
+            posts_service.get_post_by_id_if_none_match,
+            post_id,
+            if_none_match,
+        )
+        if post is None:
+            return not_modified_response(etag)
+
+        response.headers[ETAG_HEADER] = etag
         return post
 
     except ForbiddenException as exc_403:
@@ -84,15 +165,22 @@ def get_post(
 # 5 POST
 
 
-@router.post("", status_code=status.HTTP_201_CREATED, response_model=PostOut)
-def create_post(
+@router.post(
+    "",
+    status_code=status.HTTP_201_CREATED,
+    response_model=PostOut,
+)
+async def create_post(
     post: PostUpsert,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Create a new post"""
     try:
-        db_post = posts_service.create_post(db_session, post, current_user)
+        db_post = await run_in_session(
+            db_session, posts_service.create_post, post, current_user
+        )
+        await stick_to_primary(current_user.id)
         return db_post
 
     except Exception as exc_500:
@@ -104,17 +192,18 @@ def create_post(
 
 
 @router.put("/{post_id}", response_model=PostOut)
-def update_post(
+async def update_post(
     post_id: int,
     post: PostUpsert,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Update a Post"""
     try:
-        updated_post = posts_service.update_post(
-            db_session, post_id, post, current_user
+        updated_post = await run_in_session(
+            db_session, posts_service.update_post, post_id, post, current_user
         )
+        await stick_to_primary(current_user.id)
         return updated_post
 
     except UnauthorizedException as exc_401:
@@ -135,16 +224,21 @@ def update_post(
 
 
 @router.delete(
-    "/{post_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None
+    "/{post_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    response_model=None,
 )
-def delete_post(
+async def delete_post(
     post_id: int,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Delete a post"""
     try:
-        posts_service.delete_post(db_session, post_id, current_user)
+        await run_in_session(
+            db_session, posts_service.delete_post, post_id, current_user
+        )
+        await stick_to_primary(current_user.id)
         return None
 
     except UnauthorizedException as exc_401:
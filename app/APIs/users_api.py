@@ -1,17 +1,26 @@
 """ Users APIs """
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.db_config import get_db
+from app.database.db_config import get_session, run_in_session
+from app.database.db_routing import get_read_session, stick_to_primary
 from app.schemas.users_schemas import UserOut, UserUpsert
 from app.services import users_service
 from app.exceptions.http_exceptions import (
+    BadRequestException,
     UnauthorizedException,
     ForbiddenException,
     NotFoundException,
     InternalServerErrorException,
+    ServiceUnavailableException,
 )
 from app.authentication import oauth2_service
+from app.utils.cursor_utils import NEXT_CURSOR_HEADER
+from app.utils.ids_utils import MAX_IDS_PER_REQUEST, parse_ids
+from app.utils.etag_utils import ETAG_HEADER, etag_matches, not_modified_response
+from app.utils.json_utils import json_response
+from app.utils.password_utils import hash_password_async
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -20,31 +29,66 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.get("", response_model=list[UserOut])
-def get_users(
+async def get_users(
     skip: int = 0,
     limit: int = 100,
-    db_session: Session = Depends(get_db),
+    cursor: str | None = None,
+    ids: str | None = Query(None, description="Comma separated user ids"),
+    if_none_match: str | None = Header(None),
+    db_session: Session | AsyncSession = Depends(get_read_session),
     # current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
-    """Get Users"""
+    """Get Users, pass the X-Next-Cursor header back as cursor to get the next page.
+    With ids, get just those users (the ones that exist) in a single query"""
     try:
-        users = users_service.get_users(db_session, skip, limit)
-        return users
+        if ids is not None:
+            user_ids = parse_ids(ids, MAX_IDS_PER_REQUEST)
+            users = await run_in_session(
+                db_session, users_service.get_users_by_ids, user_ids
+            )
+            etag = users_service.users_etag(users)
+            if etag_matches(if_none_match, etag):
+                return not_modified_response(etag)
+
+            return json_response(
+                [user.model_dump() for user in users], {ETAG_HEADER: etag}
+            )
+
+        users, next_cursor = await run_in_session(
+            db_session, users_service.get_users, skip, limit, cursor
+        )
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+
+        return json_response(users, headers)
 
+    except BadRequestException as exc_400:
+        print(exc_400)
+        raise exc_400
     except Exception as exc_500:
         print(exc_500)
         raise InternalServerErrorException(exc_500) from exc_500
 
 
 @router.get("/{user_id}", response_model=UserOut)
-def get_user_by_id(
+async def get_user_by_id(
     user_id: int,
-    db_session: Session = Depends(get_db),
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db_session: Session | AsyncSession = Depends(get_read_session),
     # current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
-    """Get User By Id"""
+    """Get User By Id, 304 when If-None-Match has its current ETag"""
     try:
-        user = users_service.get_user_by_id(db_session, user_id)
+        user, etag = await run_in_session(
+            db_session,
+            users_service.get_user_by_id_if_none_match,
+            user_id,
+            if_none_match,
+        )
+        if user is None:
+            return not_modified_response(etag)
+
+        response.headers[ETAG_HEADER] = etag
         return user
 
     except NotFoundException as exc_404:
@@ -56,14 +100,16 @@ def get_user_by_id(
 
 
 @router.get("/email/{user_email}", response_model=UserOut)
-def get_user_by_email(
+async def get_user_by_email(
     user_email: str,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_read_session),
     # current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Get User By Email"""
     try:
-        user = users_service.get_user_by_email(db_session, user_email)
+        user = await run_in_session(
+            db_session, users_service.get_user_by_email, user_email
+        )
         return user
 
     except NotFoundException as exc_404:
@@ -78,16 +124,20 @@ def get_user_by_email(
 
 
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=UserOut)
-def create_user(
+async def create_user(
     user: UserUpsert,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
     # current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Create a new User"""
     try:
-        db_user = users_service.create_user(db_session, user)
+        user.password = await hash_password_async(user.password)
+        db_user = await run_in_session(db_session, users_service.create_user, user)
         return db_user
 
+    except ServiceUnavailableException as exc_503:
+        print(exc_503)
+        raise exc_503
     except Exception as exc_500:
         print(exc_500)
         raise InternalServerErrorException(exc_500) from exc_500
@@ -97,17 +147,24 @@ def create_user(
 
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(
+async def update_user(
     user_id: int,
     user: UserUpsert,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Update a User"""
     try:
-        updated_user = users_service.update_user(
-            db_session, user_id, user, current_user
+        if user_id != current_user.id:
+            # ? Refused before hashing, bcrypt is slow on purpose
+            await run_in_session(
+                db_session, users_service.check_own_user, user_id, current_user
+            )
+        user.password = await hash_password_async(user.password)
+        updated_user = await run_in_session(
+            db_session, users_service.update_user, user_id, user, current_user
         )
+        await stick_to_primary(current_user.id)
         return updated_user
 
     except UnauthorizedException as exc_401:
@@ -119,6 +176,9 @@ def update_user(
     except ForbiddenException as exc_403:
         print(exc_403)
         raise exc_403
+    except ServiceUnavailableException as exc_503:
+        print(exc_503)
+        raise exc_503
     except Exception as exc_500:
         print(exc_500)
         raise InternalServerErrorException(exc_500) from exc_500
@@ -128,16 +188,21 @@ def update_user(
 
 
 @router.delete(
-    "/{user_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None
+    "/{user_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    response_model=None,
 )
-def delete_user(
+async def delete_user(
     user_id: int,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Delete a User"""
     try:
-        users_service.delete_user(db_session, user_id, current_user)
+        await run_in_session(
+            db_session, users_service.delete_user, user_id, current_user
+        )
+        await stick_to_primary(current_user.id)
         return None
 
     except UnauthorizedException as exc_401:
@@ -1,8 +1,10 @@
 """ Votes APIs """
 from fastapi import APIRouter, Depends, status
 from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.db_config import get_db
+from app.database.db_config import get_session, run_in_session
+from app.database.db_routing import stick_to_primary
 from app.schemas.users_schemas import UserOut
 from app.schemas.votes_schemas import VotePayload
 from app.services import votes_service
@@ -18,15 +20,22 @@ router = APIRouter(prefix="/votes", tags=["Votes"])
 # 5 POST
 
 
-@router.post("", status_code=status.HTTP_201_CREATED, response_model=None)
+@router.post(
+    "",
+    status_code=status.HTTP_201_CREATED,
+    response_model=None,
+)
 async def create_or_delete_vote(
     vote: VotePayload,
-    db_session: Session = Depends(get_db),
+    db_session: Session | AsyncSession = Depends(get_session),
     current_user: UserOut = Depends(oauth2_service.get_current_user),
 ):
     """Create Vote"""
     try:
-        db_vote = votes_service.create_or_delete_vote(db_session, vote, current_user)
+        db_vote = await run_in_session(
+            db_session, votes_service.create_or_delete_vote, vote, current_user
+        )
+        await stick_to_primary(current_user.id)
         if not db_vote:
             return Response(
                 content=None,
@@ -1,18 +1,22 @@
 """ OAuth2 Authentication Service"""
+import asyncio
 from datetime import datetime, timedelta
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.db_config import get_db
+from app.database.db_config import get_session, run_in_session
 from app.exceptions.http_exceptions import UnauthorizedException, NotFoundException
 from app.schemas.users_schemas import UserOut
 from app.schemas.token_schemas import Token, TokenPayload
 from app.services import users_service
-from app.utils.password_utils import verify_password
+from app.utils.password_utils import verify_password_async
 from app.settings import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+# ? Same scheme, but anonymous requests get None instead of a 401
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
@@ -48,27 +52,72 @@ def verify_jwt_and_return_payload(token: str) -> TokenPayload:
         raise UnauthorizedException(err) from err
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db_session: Session = Depends(get_db)
+def get_token_user_id(
+    token: str | None = Depends(optional_oauth2_scheme),
+) -> int | None:
+    """Returns the user id of a valid token, None for missing or invalid ones"""
+    if not token:
+        return None
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
+    except JWTError:
+        return None
+
+    return payload.get("user_id")
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db_session: Session | AsyncSession = Depends(get_session),
 ) -> UserOut:
     """Get current logged in user"""
     token_payload = verify_jwt_and_return_payload(token)
-    current_user = users_service.get_user_by_id(db_session, token_payload.user_id)
+
+    user_cache = users_service.user_cache
+    # ? Checked before run_in_session -> a hit costs no DB round trip nor thread hop,
+    # ? unless the cache itself is remote: its round trip must not block the loop
+    if user_cache.is_remote:
+        current_user = await asyncio.to_thread(user_cache.get, token_payload.user_id)
+    else:
+        current_user = user_cache.get(token_payload.user_id)
+
+    if current_user is None:
+        # ? Read before the query: an update/delete_user landing meanwhile bumps it,
+        # ? and the set below is dropped instead of caching the old row
+        if user_cache.is_remote:
+            cache_version = await asyncio.to_thread(lambda: user_cache.version)
+        else:
+            cache_version = user_cache.version
+        current_user = await run_in_session(
+            db_session, users_service.get_user_by_id, token_payload.user_id
+        )
+        if user_cache.is_remote:
+            await asyncio.to_thread(
+                user_cache.set, token_payload.user_id, current_user, cache_version
+            )
+        else:
+            user_cache.set(token_payload.user_id, current_user, cache_version)
+
     return current_user
 
 
-def login_user(
-    user_credentials: OAuth2PasswordRequestForm, db_session: Session
+async def login_user(
+    user_credentials: OAuth2PasswordRequestForm, db_session: Session | AsyncSession
 ) -> Token:
     """Verifies if user can login and eventually returns a new token"""
     # ? OAuth2PasswordRequestForm username = email in our case
     try:
-        db_user = users_service.get_user_by_email(db_session, user_credentials.username)
+        db_user = await run_in_session(
+            db_session, users_service.get_user_by_email, user_credentials.username
+        )
     except NotFoundException as exc_404:
         print(exc_404)
         raise UnauthorizedException("Invalid user credentials") from exc_404
 
-    is_password_valid = verify_password(user_credentials.password, db_user.password)
+    is_password_valid = await verify_password_async(
+        user_credentials.password, db_user.password
+    )
     if not is_password_valid:
         raise UnauthorizedException("Invalid user credentials")
 
@@ -0,0 +1,68 @@
+""" Cache Backends
+
+create_cache builds the CACHE_BACKEND flavour of a cache:
+    - memory: per process LRU (app.utils.cache_utils.TTLCache)
+    - shared_memory: one segment shared by the workers of a host
+    - redis: a Redis (protocol) server shared by every host
+"""
+from functools import cache
+from app.cache.base import CacheBackend, Codec
+from app.settings import settings
+
+# ? Every cache built by this process, see close_caches
+caches: list[CacheBackend] = []
+
+
+@cache
+def get_resp_client():
+    """The RespClient shared by every redis cache of the process"""
+    # pylint: disable=import-outside-toplevel
+    from app.cache.resp_client import RespClient
+
+    return RespClient.from_url(
+        settings.CACHE_REDIS_URL, timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS
+    )
+
+
+def create_cache(
+    name: str, max_size: int, ttl_seconds: float, codec: Codec
+) -> CacheBackend:
+    """Builds a settings.CACHE_BACKEND cache, codec encodes values for shared ones"""
+    # pylint: disable=import-outside-toplevel
+    if settings.CACHE_BACKEND == "shared_memory":
+        from app.cache.shared_memory_backend import SharedMemoryCache
+
+        backend = SharedMemoryCache(
+            f"{settings.CACHE_NAMESPACE}_{name}",
+            max_size,
+            ttl_seconds,
+            codec,
+            slot_size=settings.CACHE_SHM_SLOT_SIZE,
+            lock_dir=settings.CACHE_SHM_LOCK_DIR,
+        )
+    elif settings.CACHE_BACKEND == "redis":
+        from app.cache.redis_backend import RedisCache
+
+        backend = RedisCache(
+            name,
+            ttl_seconds,
+            codec,
+            get_resp_client(),
+            namespace=settings.CACHE_NAMESPACE,
+        )
+    else:
+        from app.utils.cache_utils import TTLCache
+
+        backend = TTLCache(max_size, ttl_seconds)
+
+    caches.append(backend)
+    return backend
+
+
+def close_caches(unlink: bool = False) -> None:
+    """Closes the caches of this process, unlink=True also removes shared segments"""
+    for backend in caches:
+        backend.close()
+        if unlink:
+            backend.unlink()
+    caches.clear()
@@ -0,0 +1,63 @@
+""" Cache Backend Interface """
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Hashable
+
+
+class CacheBackend(ABC):
+    """What services and oauth2_service expect from a cache, wherever entries live"""
+
+    # ? True when every call is a network round trip (Redis): async callers should
+    # ? move it off the event loop
+    is_remote = False
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Any | None:
+        """Returns the cached value, or None if missing or expired"""
+
+    @abstractmethod
+    def peek(self, key: Hashable) -> Any | None:
+        """Like get, without counting a hit or a miss"""
+
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        """Read it before loading a value, then pass it to set"""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        """Caches value, unless anything was invalidated since version was read"""
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        """Invalidates a single entry"""
+
+    @abstractmethod
+    def delete_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Invalidates every entry whose value matches predicate, O(size)"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Invalidates every entry"""
+
+    @abstractmethod
+    def stats(self) -> dict[str, int | None]:
+        """Returns hit/miss counters and current size (None if unknown)"""
+
+    def close(self) -> None:
+        """Releases what the backend holds outside of the process (segments, sockets)"""
+
+    def unlink(self) -> None:
+        """Removes what outlives every process using the backend (shared segments),
+        once none of them needs it anymore"""
+
+
+class Codec(ABC):
+    """Turns cached values into bytes, for backends shared between processes"""
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """Serializes value"""
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """Deserializes what encode returned"""
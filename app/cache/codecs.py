@@ -0,0 +1,172 @@
+""" Cache Codecs """
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from app.cache.base import Codec
+from app.schemas.posts_schemas import PostOut
+from app.schemas.users_schemas import UserOut
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# ? Fixed size parts, little endian, no padding. Strings follow as length + utf-8
+# ? id, created_at (µs since epoch), version, flags
+USER_HEADER = struct.Struct("<qqqB")
+# ? id, created_at, n_votes, rating, version, flags
+POST_HEADER = struct.Struct("<qqqqqB")
+SHORT_LENGTH = struct.Struct("<H")
+LONG_LENGTH = struct.Struct("<I")
+
+NAIVE_DATETIME = 1 << 0
+HAS_PHONE_NUMBER = 1 << 1
+HAS_PUBLISHED = 1 << 2
+IS_PUBLISHED = 1 << 3
+HAS_RATING = 1 << 4
+HAS_TITLE = 1 << 5
+HAS_CONTENT = 1 << 6
+
+
+def _encode_datetime(value: datetime) -> tuple[int, int]:
+    if value.tzinfo is None:
+        return (value - EPOCH.replace(tzinfo=None)) // timedelta(
+            microseconds=1
+        ), NAIVE_DATETIME
+    return (value - EPOCH) // timedelta(microseconds=1), 0
+
+
+def _decode_datetime(microseconds: int, flags: int) -> datetime:
+    value = EPOCH + timedelta(microseconds=microseconds)
+    return value.replace(tzinfo=None) if flags & NAIVE_DATETIME else value
+
+
+def _pack_str(length: struct.Struct, value: str) -> bytes:
+    encoded = value.encode()
+    return length.pack(len(encoded)) + encoded
+
+
+def _unpack_str(length: struct.Struct, data: bytes, offset: int) -> tuple[str, int]:
+    (size,) = length.unpack_from(data, offset)
+    offset += length.size
+    return data[offset : offset + size].decode(), offset + size
+
+
+class UserCodec(Codec):
+    """UserOut <-> ~50 bytes (vs ~160 as JSON), ~110 with the password hash
+
+    The hash is left out by default: caches shared with other processes or hosts
+    shouldn't hold it, decoded users get an empty password.
+    """
+
+    def __init__(self, with_password: bool = False):
+        self.with_password = with_password
+
+    def encode(self, value: UserOut) -> bytes:
+        created_at, flags = _encode_datetime(value.created_at)
+        if value.phone_number is not None:
+            flags |= HAS_PHONE_NUMBER
+
+        parts = [
+            USER_HEADER.pack(value.id, created_at, value.version, flags),
+            _pack_str(SHORT_LENGTH, value.email),
+        ]
+        if self.with_password:
+            parts.append(_pack_str(SHORT_LENGTH, value.password))
+        if value.phone_number is not None:
+            parts.append(_pack_str(SHORT_LENGTH, value.phone_number))
+
+        return b"".join(parts)
+
+    def decode(self, data: bytes) -> UserOut:
+        return self.decode_from(data, 0)[0]
+
+    def decode_from(self, data: bytes, offset: int) -> tuple[UserOut, int]:
+        """Decodes a user starting at offset, returns it and where it ends"""
+        user_id, created_at, version, flags = USER_HEADER.unpack_from(data, offset)
+        offset += USER_HEADER.size
+        email, offset = _unpack_str(SHORT_LENGTH, data, offset)
+        password = ""
+        if self.with_password:
+            password, offset = _unpack_str(SHORT_LENGTH, data, offset)
+        phone_number = None
+        if flags & HAS_PHONE_NUMBER:
+            phone_number, offset = _unpack_str(SHORT_LENGTH, data, offset)
+
+        # ? model_construct: these bytes come from a validated UserOut, skip validation
+        user = UserOut.model_construct(
+            email=email,
+            password=password,
+            phone_number=phone_number,
+            id=user_id,
+            created_at=_decode_datetime(created_at, flags),
+            version=version,
+        )
+        return user, offset
+
+
+class PostCodec(Codec):
+    """PostOut (owner included) <-> compact bytes"""
+
+    # ? The owner is part of the post payload the API returns, hash included
+    user_codec = UserCodec(with_password=True)
+
+    def encode(self, value: PostOut) -> bytes:
+        created_at, flags = _encode_datetime(value.created_at)
+        if value.published is not None:
+            flags |= HAS_PUBLISHED | (IS_PUBLISHED if value.published else 0)
+        if value.rating is not None:
+            flags |= HAS_RATING
+        if value.title is not None:
+            flags |= HAS_TITLE
+        if value.content is not None:
+            flags |= HAS_CONTENT
+
+        parts = [
+            POST_HEADER.pack(
+                value.id,
+                created_at,
+                value.n_votes,
+                value.rating or 0,
+                value.version,
+                flags,
+            )
+        ]
+        if value.title is not None:
+            parts.append(_pack_str(LONG_LENGTH, value.title))
+        if value.content is not None:
+            parts.append(_pack_str(LONG_LENGTH, value.content))
+        parts.append(self.user_codec.encode(value.owner))
+
+        return b"".join(parts)
+
+    def decode(self, data: bytes) -> PostOut:
+        post_id, created_at, n_votes, rating, version, flags = POST_HEADER.unpack_from(
+            data
+        )
+        offset = POST_HEADER.size
+        title = content = None
+        if flags & HAS_TITLE:
+            title, offset = _unpack_str(LONG_LENGTH, data, offset)
+        if flags & HAS_CONTENT:
+            content, offset = _unpack_str(LONG_LENGTH, data, offset)
+        owner, _ = self.user_codec.decode_from(data, offset)
+
+        return PostOut.model_construct(
+            title=title,
+            content=content,
+            published=bool(flags & IS_PUBLISHED) if flags & HAS_PUBLISHED else None,
+            rating=rating if flags & HAS_RATING else None,
+            id=post_id,
+            created_at=_decode_datetime(created_at, flags),
+            owner=owner,
+            n_votes=n_votes,
+            version=version,
+        )
+
+
+class FlagCodec(Codec):
+    """For caches that only record that a key exists (e.g. recent writers)"""
+
+    def encode(self, value: Any) -> bytes:
+        return b"\x01"
+
+    def decode(self, data: bytes) -> bool:
+        return True
@@ -0,0 +1,167 @@
+""" Redis Cache Backend """
+import asyncio
+from functools import wraps
+from typing import Any, Callable, Hashable, TypeVar
+import greenlet
+from sqlalchemy.util import await_only
+from app.cache.base import CacheBackend, Codec
+from app.cache.resp_client import RespClient, RespError
+
+SCAN_COUNT = 500
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def off_the_loop(method: F) -> F:
+    """Keeps the method's socket I/O off the event loop thread when it's called there
+    by sync code that AsyncSession.run_sync drives (the services): its greenlet awaits
+    the call in a worker thread instead. Async code hands cache calls to
+    asyncio.to_thread itself (see is_remote)"""
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # ? Worker thread (sync sessions, asyncio.to_thread): blocking is fine
+            return method(*args, **kwargs)
+
+        if greenlet.getcurrent().parent is None:
+            # ? Straight on the loop, outside of any run_sync: nothing to await from
+            return method(*args, **kwargs)
+
+        return await_only(asyncio.to_thread(method, *args, **kwargs))
+
+    return wrapper  # type: ignore[return-value]
+
+
+class RedisCache(CacheBackend):
+    """TTL cache in Redis (or anything speaking its protocol), shared by every host
+
+    Keys are namespaced under "<namespace>:<name>:". Redis evicts according to its
+    own maxmemory-policy, there is no max_size here. Unreachable server -> misses.
+    """
+
+    is_remote = True
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float,
+        codec: Codec,
+        client: RespClient,
+        namespace: str = "app",
+    ):
+        self.ttl_milliseconds = max(1, int(ttl_seconds * 1000))
+        self.codec = codec
+        self.client = client
+        self.prefix = f"{namespace}:{name}:"
+        # ? Outside of prefix -> SCAN never matches it
+        self.version_key = f"{namespace}:{name}#version"
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    def _read(self, key: Hashable) -> Any | None:
+        try:
+            data = self.client.execute("GET", self._key(key))
+        except (OSError, RespError) as exc:
+            print(exc)
+            return None
+
+        return None if data is None else self.codec.decode(data)
+
+    @off_the_loop
+    def get(self, key: Hashable) -> Any | None:
+        value = self._read(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @off_the_loop
+    def peek(self, key: Hashable) -> Any | None:
+        return self._read(key)
+
+    @property
+    @off_the_loop
+    def version(self) -> int:
+        try:
+            return int(self.client.execute("GET", self.version_key) or 0)
+        except (OSError, RespError) as exc:
+            print(exc)
+            # ? Matches no version -> the following set is skipped
+            return -1
+
+    @off_the_loop
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        command = ("SET", self._key(key), self.codec.encode(value))
+        command += ("PX", self.ttl_milliseconds)
+        try:
+            if version is None:
+                self.client.execute(*command)
+                return
+
+            # ? WATCH the version: an invalidation landing before EXEC aborts the SET
+            self.client.transaction(
+                self.version_key,
+                lambda current: int(current or 0) == version,
+                [command],
+            )
+        except (OSError, RespError) as exc:
+            print(exc)
+
+    @off_the_loop
+    def delete(self, key: Hashable) -> None:
+        try:
+            self.client.pipeline([("DEL", self._key(key)), ("INCR", self.version_key)])
+        except (OSError, RespError) as exc:
+            # ? Nothing else to do: the entry stays stale until its TTL
+            print(exc)
+
+    def _delete_keys(self, predicate: Callable[[list[bytes]], list[bytes]]) -> None:
+        # ? Version first: sets that read it before now are aborted, sets that
+        # ? landed before now are deleted by the scan below
+        self.client.execute("INCR", self.version_key)
+        cursor = b"0"
+        while True:
+            cursor, keys = self.client.execute(
+                "SCAN", cursor, "MATCH", f"{self.prefix}*", "COUNT", SCAN_COUNT
+            )
+            keys = predicate(keys) if keys else keys
+            if keys:
+                self.client.execute("DEL", *keys)
+            if cursor == b"0":
+                return
+
+    @off_the_loop
+    def delete_where(self, predicate: Callable[[Any], bool]) -> None:
+        def matching_keys(keys: list[bytes]) -> list[bytes]:
+            values = self.client.execute("MGET", *keys)
+            return [
+                key
+                for key, data in zip(keys, values)
+                if data is not None and predicate(self.codec.decode(data))
+            ]
+
+        try:
+            self._delete_keys(matching_keys)
+        except (OSError, RespError) as exc:
+            print(exc)
+
+    @off_the_loop
+    def clear(self) -> None:
+        try:
+            self._delete_keys(lambda keys: keys)
+        except (OSError, RespError) as exc:
+            print(exc)
+
+    def stats(self) -> dict[str, int | None]:
+        # ? Counting keys would mean a SCAN of the whole namespace
+        return {"hits": self.hits, "misses": self.misses, "size": None}
+
+    def close(self) -> None:
+        self.client.close()
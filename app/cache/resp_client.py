@@ -0,0 +1,193 @@
+""" Minimal Redis Protocol (RESP2) Client """
+import socket
+from contextlib import contextmanager
+from queue import Empty, Full, LifoQueue
+from typing import Any, Callable, Iterator
+from urllib.parse import unquote, urlparse
+
+CRLF = b"\r\n"
+
+
+class RespError(Exception):
+    """Error reply sent by the server (-ERR ...)"""
+
+
+def encode_command(*args: bytes | str | int | float) -> bytes:
+    """Encodes a command as a RESP array of bulk strings"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%b\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class Connection:
+    """One socket to the server, replies are read back in order"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        db: int,
+        timeout: float,
+        username: str | None = None,
+        password: str | None = None,
+    ):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        try:
+            if password is not None:
+                # ? AUTH user password -> Redis 6 ACL user, AUTH password -> requirepass
+                self.execute(
+                    ("AUTH", username, password) if username else ("AUTH", password)
+                )
+            if db:
+                self.execute(("SELECT", db))
+        except Exception:
+            self.close()
+            raise
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(CRLF):
+            raise ConnectionError("Connection closed by the server")
+
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            return RespError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the server")
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply: {line!r}")
+
+    def pipeline(self, commands: list[tuple]) -> list[Any]:
+        """Sends every command in a single write, then reads their replies"""
+        self._sock.sendall(b"".join(encode_command(*command) for command in commands))
+        # ? Every reply is read even after an error one, or the next ones get out of sync
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, command: tuple) -> Any:
+        """Sends one command and returns its reply"""
+        return self.pipeline([command])[0]
+
+    def close(self) -> None:
+        """Closes the socket"""
+        self._reader.close()
+        self._sock.close()
+
+
+class RespClient:
+    """Thread safe client: each call borrows a connection from a LIFO pool"""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        timeout: float = 0.1,
+        max_connections: int = 32,
+        username: str | None = None,
+        password: str | None = None,
+    ):
+        self.host, self.port, self.db, self.timeout = host, port, db, timeout
+        self.username, self.password = username, password
+        # ? LIFO -> the most recently used connections stay warm, idle ones age out
+        self._pool: LifoQueue[Connection] = LifoQueue(max_connections)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RespClient":
+        """redis://[[username]:password@]host:port/db"""
+        parsed = urlparse(url)
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            username=unquote(parsed.username) if parsed.username else None,
+            password=unquote(parsed.password) if parsed.password else None,
+            **kwargs,
+        )
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Borrows a pooled connection, for several round trips on the same socket"""
+        try:
+            connection = self._pool.get_nowait()
+        except Empty:
+            connection = Connection(
+                self.host,
+                self.port,
+                self.db,
+                self.timeout,
+                self.username,
+                self.password,
+            )
+
+        try:
+            yield connection
+        except RespError:
+            self._release(connection)
+            raise
+        except Exception:
+            # ? Timeout or broken socket: replies may still be in flight, drop it
+            connection.close()
+            raise
+
+        self._release(connection)
+
+    def pipeline(self, commands: list[tuple]) -> list[Any]:
+        """Runs commands in a single round trip, returns their replies"""
+        with self.connection() as connection:
+            return connection.pipeline(commands)
+
+    def transaction(
+        self, watch_key: str, check: Callable[[Any], bool], commands: list[tuple]
+    ) -> bool:
+        """Runs commands atomically if check(value of watch_key) holds and the key
+        doesn't change meanwhile (WATCH/MULTI/EXEC), returns whether they ran"""
+        with self.connection() as connection:
+            _, value = connection.pipeline([("WATCH", watch_key), ("GET", watch_key)])
+            if not check(value):
+                connection.execute(("UNWATCH",))
+                return False
+
+            replies = connection.pipeline([("MULTI",), *commands, ("EXEC",)])
+            # ? EXEC replies nil when watch_key changed after WATCH
+            return replies[-1] is not None
+
+    def execute(self, *command: bytes | str | int | float) -> Any:
+        """Runs a single command, returns its reply"""
+        return self.pipeline([command])[0]
+
+    def _release(self, connection: Connection) -> None:
+        try:
+            self._pool.put_nowait(connection)
+        except Full:
+            connection.close()
+
+    def close(self) -> None:
+        """Closes every pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                return
@@ -0,0 +1,258 @@
+""" Shared Memory Cache Backend """
+import fcntl
+import glob
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Hashable, Iterator
+from app.cache.base import CacheBackend, Codec
+
+MAGIC = b"APPCACHE"
+# ? magic, n_slots, slot_size, version
+SEGMENT_HEADER = struct.Struct("<8sQQQ")
+VERSION_OFFSET = 24
+# ? key hash (0 = free slot), expires at (time.time()), payload length
+SLOT_HEADER = struct.Struct("<QdI")
+# ? A key can only live in the BUCKET_SLOTS slots of its bucket: lookups scan a
+# ? handful of slots, and each bucket is locked on its own
+BUCKET_SLOTS = 8
+
+
+def key_hash(key: Hashable) -> int:
+    """Hash of key that is the same in every process, unlike hash()"""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+# pylint: disable=protected-access
+class SharedMemoryCache(CacheBackend):
+    """TTL cache in a shared memory segment, shared by every worker of the host
+
+    Entries are encoded with codec into max_size fixed size slots: values that don't
+    fit in slot_size are not cached. A full bucket evicts its entry closest to
+    expiring, so keys may be evicted before the cache holds max_size of them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl_seconds: float,
+        codec: Codec,
+        slot_size: int = 1024,
+        lock_dir: str | None = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.codec = codec
+        self.slot_size = slot_size
+        self.n_buckets = max(1, -(-max_size // BUCKET_SLOTS))
+        self.n_slots = self.n_buckets * BUCKET_SLOTS
+        self.max_payload_size = slot_size - SLOT_HEADER.size
+        self.hits = 0
+        self.misses = 0
+
+        # ? The layout is part of the name: changing the settings never attaches
+        # ? to a segment laid out differently
+        self.segment_name = f"{name}_{self.n_slots}x{slot_size}"
+        lock_path = os.path.join(
+            lock_dir or tempfile.gettempdir(), f"{self.segment_name}.lock"
+        )
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        # ? fcntl locks exclude other processes only, threads take this one first.
+        # ? Reentrant: the version is bumped while holding a bucket lock
+        self._thread_lock = threading.RLock()
+
+        with self._locked(-1):
+            self._shm = self._open_segment()
+        self._buf = self._shm.buf
+
+    def _open_segment(self) -> shared_memory.SharedMemory:
+        size = SEGMENT_HEADER.size + self.n_slots * self.slot_size
+        try:
+            shm = shared_memory.SharedMemory(self.segment_name, create=True, size=size)
+            SEGMENT_HEADER.pack_into(shm.buf, 0, MAGIC, self.n_slots, self.slot_size, 0)
+        except FileExistsError as exc:
+            shm = shared_memory.SharedMemory(self.segment_name)
+            if SEGMENT_HEADER.unpack_from(shm.buf)[0] != MAGIC:
+                shm.close()
+                raise ValueError(f"{self.segment_name} is not a cache segment") from exc
+
+        # ? The segment outlives workers: don't let the resource tracker unlink it
+        # ? when the first of them exits, unlink() does it
+        resource_tracker.unregister(getattr(shm, "_name", shm.name), "shared_memory")
+        return shm
+
+    @contextmanager
+    def _locked(self, bucket: int) -> Iterator[None]:
+        # ? One byte of the lock file per bucket, byte 0 for the segment header
+        with self._thread_lock:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, bucket + 1)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, bucket + 1)
+
+    def _slot_offsets(self, bucket: int) -> range:
+        start = SEGMENT_HEADER.size + bucket * BUCKET_SLOTS * self.slot_size
+        return range(start, start + BUCKET_SLOTS * self.slot_size, self.slot_size)
+
+    def _read(self, key: Hashable) -> Any | None:
+        keyhash = key_hash(key)
+        bucket = keyhash % self.n_buckets
+        with self._locked(bucket):
+            for offset in self._slot_offsets(bucket):
+                slot_hash, expires_at, length = SLOT_HEADER.unpack_from(
+                    self._buf, offset
+                )
+                if slot_hash == keyhash:
+                    if expires_at < time.time():
+                        return None
+                    start = offset + SLOT_HEADER.size
+                    data = bytes(self._buf[start : start + length])
+                    break
+            else:
+                return None
+
+        return self.codec.decode(data)
+
+    def get(self, key: Hashable) -> Any | None:
+        value = self._read(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Any | None:
+        return self._read(key)
+
+    @property
+    def version(self) -> int:
+        return struct.unpack_from("<Q", self._buf, VERSION_OFFSET)[0]
+
+    def _bump_version(self) -> None:
+        with self._locked(-1):
+            struct.pack_into("<Q", self._buf, VERSION_OFFSET, self.version + 1)
+
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        data = self.codec.encode(value)
+        if len(data) > self.max_payload_size:
+            return
+
+        keyhash = key_hash(key)
+        bucket = keyhash % self.n_buckets
+        with self._locked(bucket):
+            # ? Under the bucket lock: a delete of this key can't slip in between
+            if version is not None and version != self.version:
+                return
+
+            now = time.time()
+            target, target_expires_at = None, None
+            for offset in self._slot_offsets(bucket):
+                slot_hash, expires_at, _ = SLOT_HEADER.unpack_from(self._buf, offset)
+                if slot_hash == keyhash:
+                    target = offset
+                    break
+                if slot_hash == 0 or expires_at < now:
+                    expires_at = float("-inf")
+                if target is None or expires_at < target_expires_at:
+                    target, target_expires_at = offset, expires_at
+
+            # ? Payload before header, readers never see a key with a partial value
+            start = target + SLOT_HEADER.size
+            self._buf[start : start + len(data)] = data
+            SLOT_HEADER.pack_into(
+                self._buf, target, keyhash, now + self.ttl_seconds, len(data)
+            )
+
+    def delete(self, key: Hashable) -> None:
+        keyhash = key_hash(key)
+        bucket = keyhash % self.n_buckets
+        with self._locked(bucket):
+            for offset in self._slot_offsets(bucket):
+                if SLOT_HEADER.unpack_from(self._buf, offset)[0] == keyhash:
+                    SLOT_HEADER.pack_into(self._buf, offset, 0, 0, 0)
+            self._bump_version()
+
+    def _delete_slots(self, predicate: Callable[[int, int], bool]) -> None:
+        # ? Version first: sets that read it before now are dropped, sets that
+        # ? landed before now are deleted by the scan below
+        self._bump_version()
+        for bucket in range(self.n_buckets):
+            with self._locked(bucket):
+                for offset in self._slot_offsets(bucket):
+                    keyhash, _, length = SLOT_HEADER.unpack_from(self._buf, offset)
+                    if keyhash and predicate(offset, length):
+                        SLOT_HEADER.pack_into(self._buf, offset, 0, 0, 0)
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> None:
+        def matches(offset: int, length: int) -> bool:
+            start = offset + SLOT_HEADER.size
+            return predicate(
+                self.codec.decode(bytes(self._buf[start : start + length]))
+            )
+
+        self._delete_slots(matches)
+
+    def clear(self) -> None:
+        self._delete_slots(lambda offset, length: True)
+
+    def stats(self) -> dict[str, int]:
+        # ? Lock free scan: approximate, but it never blocks the workers
+        now = time.time()
+        size = 0
+        for offset in range(
+            SEGMENT_HEADER.size, len(self._buf) - self.slot_size + 1, self.slot_size
+        ):
+            keyhash, expires_at, _ = SLOT_HEADER.unpack_from(self._buf, offset)
+            size += keyhash != 0 and expires_at >= now
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+    def close(self) -> None:
+        """Detaches from the segment, other processes keep using it"""
+        self._buf = None
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """Removes the segment, processes still attached keep their mapping"""
+        # ? unlink() unregisters it from the resource tracker, which must know it
+        resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+
+def unlink_segments(prefix: str, lock_dir: str | None = None) -> list[str]:
+    """Removes the cache segments named prefix*, found by their lock files
+
+    For processes that never attached to them, e.g. a gunicorn master that didn't
+    preload the app. Returns the names of the removed segments.
+    """
+    lock_dir = lock_dir or tempfile.gettempdir()
+    unlinked = []
+    for lock_path in glob.glob(
+        os.path.join(glob.escape(lock_dir), f"{glob.escape(prefix)}*.lock")
+    ):
+        segment_name = os.path.basename(lock_path).removesuffix(".lock")
+        try:
+            shm = shared_memory.SharedMemory(segment_name)
+        except FileNotFoundError:
+            pass
+        else:
+            is_cache = (
+                shm.size >= SEGMENT_HEADER.size
+                and SEGMENT_HEADER.unpack_from(shm.buf)[0] == MAGIC
+            )
+            shm.close()
+            # ? Not ours: leave both the segment and its lock file alone
+            if not is_cache:
+                resource_tracker.unregister(shm._name, "shared_memory")
+                continue
+            shm.unlink()
+            unlinked.append(segment_name)
+        os.remove(lock_path)
+    return unlinked
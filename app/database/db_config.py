@@ -1,9 +1,22 @@
 """ DB Config """
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from app.monitoring.pool_instrumentation import (
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    timed_pool_class,
+)
+from app.monitoring.sql_instrumentation import instrument_engine
 from app.settings import settings
 
+T = TypeVar("T")
 
 DB_URL = (
     f"postgresql://"
@@ -11,13 +24,84 @@ DB_URL = (
     f"{settings.DB_HOSTNAME}:{settings.DB_PORT}/"
     f"{settings.DB_NAME}"
 )
+ASYNC_DB_URL = DB_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+READ_DB_URL = (
+    f"postgresql://"
+    f"{settings.DB_USERNAME}:{settings.DB_PASSWORD}@"
+    f"{settings.DB_READ_HOSTNAME}:{settings.DB_READ_PORT or settings.DB_PORT}/"
+    f"{settings.DB_NAME}"
+)
+ASYNC_READ_DB_URL = READ_DB_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE or settings.DB_THREADPOOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    # ? Drop connections before Postgres/PgBouncer/LB idle timeouts kill them
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
 
 Engine = create_engine(
     DB_URL,
+    poolclass=TimedQueuePool,
+    **POOL_OPTIONS,
     # connect_args={"check_same_thread": False}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=Engine)
 
+AsyncEngine = create_async_engine(
+    ASYNC_DB_URL, poolclass=TimedAsyncQueuePool, **POOL_OPTIONS
+)
+instrument_engine(Engine)
+# ? Cursor events only exist on the sync engine the async one wraps
+instrument_engine(AsyncEngine.sync_engine)
+# ? expire_on_commit=False -> committed objects can still be read without a new SELECT
+AsyncSessionLocal = async_sessionmaker(
+    bind=AsyncEngine, autoflush=False, expire_on_commit=False
+)
+
+# ? No replica configured -> read sessions share the primary engines and pools
+if settings.DB_READ_HOSTNAME:
+    ReadEngine = create_engine(
+        READ_DB_URL, poolclass=timed_pool_class("sync_read"), **POOL_OPTIONS
+    )
+    AsyncReadEngine = create_async_engine(
+        ASYNC_READ_DB_URL,
+        poolclass=timed_pool_class("async_read", is_async=True),
+        **POOL_OPTIONS,
+    )
+    instrument_engine(ReadEngine)
+    instrument_engine(AsyncReadEngine.sync_engine)
+else:
+    ReadEngine = Engine
+    AsyncReadEngine = AsyncEngine
+
+# ? Empty when reads go to the primary anyway
+REPLICA_ENGINES = frozenset({ReadEngine, AsyncReadEngine.sync_engine}) - {
+    Engine,
+    AsyncEngine.sync_engine,
+}
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=ReadEngine)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=AsyncReadEngine, autoflush=False, expire_on_commit=False
+)
+
+# ? By bind, for sessions opened outside of a request (e.g. by a shared single flight)
+SESSION_FACTORIES = {
+    ReadEngine: ReadSessionLocal,
+    AsyncReadEngine: AsyncReadSessionLocal,
+    Engine: SessionLocal,
+    AsyncEngine: AsyncSessionLocal,
+}
+
+# ? Bounded pool for blocking psycopg2 work, keeps it off the event loop
+# ? and away from the threads Starlette uses for sync routes
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_THREADPOOL_SIZE, thread_name_prefix="db"
+)
+
 Base = declarative_base()
 # ? Porkaround to make SQLAlchemy create the "votes" table
 # ! Don't move this import, needs to stay after the Base var declaration!
@@ -32,3 +116,75 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Return async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ? Session dependency used by the routers, DB_ASYNC_ENABLED=False falls back to psycopg2
+get_session = get_async_db if settings.DB_ASYNC_ENABLED else get_db
+
+
+def routed_to_primary(db_session: Session | AsyncSession) -> bool:
+    """Whether a replica serves reads but db_session reads from the primary, i.e. it
+    belongs to a user that wrote recently (read your writes)"""
+    if not REPLICA_ENGINES:
+        return False
+    if isinstance(db_session, AsyncSession):
+        db_session = db_session.sync_session
+
+    return db_session.get_bind() not in REPLICA_ENGINES
+
+
+async def run_in_session(
+    db_session: Session | AsyncSession,
+    func: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """Run a Session based service/repository function without blocking the event loop"""
+    if isinstance(db_session, AsyncSession):
+        # ? run_sync drives the asyncpg driver from the event loop through a greenlet,
+        # ? so the very same sync code (lazy loads included) never holds a thread
+        return await db_session.run_sync(func, *args, **kwargs)
+
+    # ? copy_context() -> request scoped contextvars are visible inside the worker thread
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        db_executor, context.run, partial(func, db_session, *args, **kwargs)
+    )
+
+
+async def run_in_new_session(
+    bind: Any,
+    func: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """run_in_session on a session of its own bound to bind (a request session's bind):
+    for work shared by several requests, which may outlive the one that started it"""
+    session_factory = SESSION_FACTORIES[bind]
+    if isinstance(session_factory, async_sessionmaker):
+        async with session_factory() as db_session:
+            return await run_in_session(db_session, func, *args, **kwargs)
+
+    # ? Opened, used and closed (a ROLLBACK round trip) by the worker thread
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        db_executor,
+        context.run,
+        partial(_run_in_closed_session, session_factory, func, *args, **kwargs),
+    )
+
+
+def _run_in_closed_session(
+    session_factory: Callable[[], Session],
+    func: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    with session_factory() as db_session:
+        return func(db_session, *args, **kwargs)
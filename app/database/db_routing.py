@@ -0,0 +1,62 @@
+""" DB Read/Write Routing """
+import asyncio
+from fastapi import Depends
+from app.authentication import oauth2_service
+from app.cache import create_cache
+from app.cache.codecs import FlagCodec
+from app.database.db_config import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+)
+from app.settings import settings
+
+# ? User ids that wrote recently, their reads go to the primary until they expire
+# ? Shared backends also route the user's next read handled by another worker
+recent_writers = create_cache(
+    "recent_writer",
+    settings.USER_CACHE_MAX_SIZE,
+    settings.DB_READ_AFTER_WRITE_SECONDS,
+    FlagCodec(),
+)
+
+
+def reads_from_primary(user_id: int | None) -> bool:
+    """Read your writes: the replica may not have replayed this user's last write yet"""
+    return user_id is not None and recent_writers.get(user_id) is not None
+
+
+async def stick_to_primary(user_id: int) -> None:
+    """Sends the user's reads to the primary for a while, call it once their write is
+    committed and before responding: their very next read must already be routed"""
+    if recent_writers.is_remote:
+        await asyncio.to_thread(recent_writers.set, user_id, True)
+    else:
+        recent_writers.set(user_id, True)
+
+
+# Dependency
+def get_read_db(user_id: int | None = Depends(oauth2_service.get_token_user_id)):
+    """Return read only database session, on the replica when there is one"""
+    db = (SessionLocal if reads_from_primary(user_id) else ReadSessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(
+    user_id: int | None = Depends(oauth2_service.get_token_user_id),
+):
+    """Return read only async database session, on the replica when there is one"""
+    if recent_writers.is_remote:
+        from_primary = await asyncio.to_thread(reads_from_primary, user_id)
+    else:
+        from_primary = reads_from_primary(user_id)
+    session_factory = AsyncSessionLocal if from_primary else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
+
+
+get_read_session = get_async_read_db if settings.DB_ASYNC_ENABLED else get_read_db
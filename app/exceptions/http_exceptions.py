@@ -3,6 +3,16 @@ from fastapi import HTTPException, status
 
 
 # 400
+class BadRequestException(HTTPException):
+    """400 Bad Request Exception"""
+
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{detail}",
+        )
+
+
 class UnauthorizedException(HTTPException):
     """401 Unauthorized Exception"""
 
@@ -53,3 +63,13 @@ class InternalServerErrorException(HTTPException):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"{detail}",
         )
+
+
+class ServiceUnavailableException(HTTPException):
+    """503: Service Unavailable Exception"""
+
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{detail}",
+        )
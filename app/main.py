@@ -1,4 +1,11 @@
 """ FastAPI Entrypoint """
+import time
+
+# ? Before any other import, the startup report measures how long they all take
+IMPORTS_STARTED = time.perf_counter()
+
+# pylint: disable=wrong-import-position
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,13 +15,43 @@ from .APIs.auth_api import router as auth_router
 from .APIs.users_api import router as users_router
 from .APIs.posts_api import router as posts_router
 from .APIs.votes_api import router as votes_router
+from .APIs.metrics_api import router as metrics_router
+from .database.db_config import AsyncEngine, AsyncReadEngine, Engine, ReadEngine
+from .monitoring.metrics_middleware import MetricsMiddleware
+from .monitoring.metrics_registry import metrics
+from .monitoring.sql_instrumentation import DbTimingMiddleware
+from .settings import settings
+from .startup import record_phase, warm_up
+from .utils.cursor_utils import NEXT_CURSOR_HEADER
+from .utils.etag_utils import ETAG_HEADER
+from .utils.password_utils import shutdown_password_pool
 
 load_dotenv(verbose=True)
 
 # ? Don't need this once Alembic is implemented
 # Base.metadata.create_all(bind=Engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Startup/shutdown hooks, shutdown runs once in-flight requests are drained"""
+    if settings.METRICS_ENABLED:
+        # ? Started here, not at import: threads don't survive gunicorn's fork
+        metrics.start_flushing()
+    if settings.STARTUP_WARMUP_ENABLED:
+        await warm_up()
+
+    yield
+
+    metrics.stop_flushing()
+    for async_engine in {AsyncEngine, AsyncReadEngine}:
+        await async_engine.dispose()
+    for engine in {Engine, ReadEngine}:
+        engine.dispose()
+    shutdown_password_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "https://www.google.com",
@@ -28,15 +65,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
+if settings.METRICS_ENABLED:
+    app.add_middleware(DbTimingMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(posts_router)
 app.include_router(votes_router)
+app.include_router(metrics_router)
 
 
 @app.get("/", response_model=str)
 def hello_world():
     return "Hello World!"
+
+
+record_phase("imports", time.perf_counter() - IMPORTS_STARTED)
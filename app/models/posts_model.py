@@ -1,11 +1,14 @@
 """ Posts Model """
 from sqlalchemy import (
+    DDL,
     TIMESTAMP,
     Boolean,
     Column,
     ForeignKey,
+    Index,
     Integer,
     String,
+    event,
     text,
 )
 from sqlalchemy.orm import relationship
@@ -16,12 +19,25 @@ class PostModel(Base):
     """Post Table Class"""
 
     __tablename__ = "posts"
+    __table_args__ = (
+        # ? Trigram index -> serves ILIKE '%term%' and similarity ranking on titles
+        Index(
+            "ix_posts_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(String, nullable=False)
     published = Column(Boolean, nullable=True, default=False)
     rating = Column(Integer, nullable=True)
+    # ? Denormalized number of votes, maintained by votes_service
+    vote_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # ? Bumped by every update and vote, the ETag of the post is derived from it
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
     created_at = Column(
         TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
     )
@@ -29,3 +45,11 @@ class PostModel(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     owner = relationship("UserModel")
+
+
+# ? gin_trgm_ops needs the pg_trgm extension, also when tables come from create_all()
+event.listen(
+    PostModel.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+)
@@ -16,3 +16,5 @@ class UserModel(Base):
         TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
     )
     phone_number = Column(String, nullable=True)
+    # ? Bumped by every update, the ETag of the user (and of its posts) derives from it
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
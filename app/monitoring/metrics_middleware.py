@@ -0,0 +1,55 @@
+""" Metrics Middleware """
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.monitoring.metrics_registry import metrics
+
+REQUESTS_TOTAL = "http_requests_total"
+REQUESTS_IN_FLIGHT = "http_requests_in_flight"
+REQUEST_DURATION = "http_request_duration_seconds"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per route request counts, in flight requests and latency"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # ? The route is only known once the router has run, so in flight is per method
+        metrics.add(REQUESTS_IN_FLIGHT, "Requests being served", {"method": method}, 1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            # ? Route template (/posts/{post_id}), never the raw path -> bounded cardinality
+            route = scope.get("route")
+            route_path = route.path if route else "<unmatched>"
+
+            metrics.add(
+                REQUESTS_IN_FLIGHT, "Requests being served", {"method": method}, -1
+            )
+            metrics.inc(
+                REQUESTS_TOTAL,
+                "Requests served",
+                {"method": method, "route": route_path, "status": str(status_code)},
+            )
+            metrics.observe(
+                REQUEST_DURATION,
+                "Request latency, p50/p95/p99 via histogram_quantile()",
+                {"method": method, "route": route_path},
+                duration,
+            )
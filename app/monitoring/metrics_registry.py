@@ -0,0 +1,268 @@
+""" Metrics Registry """
+import fcntl
+import glob
+import os
+import threading
+from typing import Callable, Iterator
+import orjson
+from app.settings import settings
+
+# ? Seconds, Prometheus derives p50/p95/p99 from the buckets with histogram_quantile()
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ? In METRICS_MULTIPROC_DIR, next to the metrics_<pid>.json of each worker. Not
+# ? matched by metrics_*.json
+METRICS_ARCHIVE_FILE = "archived_metrics.json"
+METRICS_LOCK_FILE = "metrics.lock"
+
+# ? {"type": "counter" | "gauge" | "histogram", "help": str, "samples": {sample: value}}
+Family = dict
+Collector = Callable[[], dict[str, Family]]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample_name(name: str, labels: dict[str, str]) -> str:
+    if not labels:
+        return name
+
+    rendered_labels = ",".join(
+        f'{key}="{_escape_label_value(str(value))}"' for key, value in labels.items()
+    )
+    return f"{name}{{{rendered_labels}}}"
+
+
+def _write_snapshot(path: str, families: dict[str, Family]) -> None:
+    # ? Write then rename -> readers never see a half written file
+    with open(f"{path}.tmp", "wb") as snapshot_file:
+        snapshot_file.write(orjson.dumps(families))
+    os.replace(f"{path}.tmp", path)
+
+
+def _read_snapshot(path: str) -> dict[str, Family] | None:
+    try:
+        with open(path, "rb") as snapshot_file:
+            return orjson.loads(snapshot_file.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def _read_snapshots() -> Iterator[tuple[str, int, dict[str, Family]]]:
+    """Yields (path, pid, families) for every worker snapshot of METRICS_MULTIPROC_DIR"""
+    for path in glob.glob(
+        os.path.join(settings.METRICS_MULTIPROC_DIR, "metrics_*.json")
+    ):
+        pid = int(os.path.basename(path)[len("metrics_") : -len(".json")])
+        families = _read_snapshot(path)
+        if families is not None:
+            yield path, pid, families
+
+
+def _merge(merged: dict[str, Family], families: dict[str, Family]) -> None:
+    """Sums the samples of families into merged"""
+    for name, family in families.items():
+        merged_samples = merged.setdefault(name, {**family, "samples": {}})["samples"]
+        for sample, value in family["samples"].items():
+            merged_samples[sample] = merged_samples.get(sample, 0) + value
+
+
+def _pid_is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """Process local counters, gauges and histograms, exposed in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: dict[str, Family] = {}
+        self._histogram_samples: dict[tuple, list[str]] = {}
+        self._collectors: list[Collector] = []
+        self._flusher: threading.Thread | None = None
+        self._stop_flushing = threading.Event()
+
+    def _family(self, name: str, metric_type: str, description: str) -> Family:
+        family = self._families.get(name)
+        if family is None:
+            family = {"type": metric_type, "help": description, "samples": {}}
+            self._families[name] = family
+        return family
+
+    def inc(
+        self, name: str, description: str, labels: dict[str, str], value: float = 1
+    ) -> None:
+        """Increments a counter"""
+        sample = _sample_name(name, labels)
+        with self._lock:
+            samples = self._family(name, "counter", description)["samples"]
+            samples[sample] = samples.get(sample, 0) + value
+
+    def add(
+        self, name: str, description: str, labels: dict[str, str], value: float
+    ) -> None:
+        """Moves a gauge up (or down, with a negative value)"""
+        sample = _sample_name(name, labels)
+        with self._lock:
+            samples = self._family(name, "gauge", description)["samples"]
+            samples[sample] = samples.get(sample, 0) + value
+
+    def observe(
+        self,
+        name: str,
+        description: str,
+        labels: dict[str, str],
+        value: float,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        """Records a value in a cumulative histogram"""
+        label_key = (name, tuple(labels.items()))
+        with self._lock:
+            samples = self._family(name, "histogram", description)["samples"]
+
+            # ? Sample names are built once per label set, not on every request
+            histogram_samples = self._histogram_samples.get(label_key)
+            if histogram_samples is None:
+                histogram_samples = [
+                    _sample_name(f"{name}_bucket", {**labels, "le": str(upper_bound)})
+                    for upper_bound in buckets
+                ] + [
+                    _sample_name(f"{name}_bucket", {**labels, "le": "+Inf"}),
+                    _sample_name(f"{name}_count", labels),
+                    _sample_name(f"{name}_sum", labels),
+                ]
+                self._histogram_samples[label_key] = histogram_samples
+
+            *bucket_samples, inf_sample, count_sample, sum_sample = histogram_samples
+            for upper_bound, sample in zip(buckets, bucket_samples):
+                samples[sample] = samples.get(sample, 0) + (value <= upper_bound)
+            for sample, increment in (
+                (inf_sample, 1),
+                (count_sample, 1),
+                (sum_sample, value),
+            ):
+                samples[sample] = samples.get(sample, 0) + increment
+
+    def register_collector(self, collector: Collector) -> None:
+        """Adds a callable returning extra families (cache stats, pool stats...)"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict[str, Family]:
+        """Returns a copy of this process families, collectors included"""
+        with self._lock:
+            families = {
+                name: {**family, "samples": dict(family["samples"])}
+                for name, family in self._families.items()
+            }
+
+        for collector in self._collectors:
+            families.update(collector())
+
+        return families
+
+    def flush(self) -> None:
+        """Writes this process snapshot to METRICS_MULTIPROC_DIR"""
+        if not settings.METRICS_MULTIPROC_DIR:
+            return
+
+        path = os.path.join(
+            settings.METRICS_MULTIPROC_DIR, f"metrics_{os.getpid()}.json"
+        )
+        _write_snapshot(path, self.snapshot())
+
+    def _flush_periodically(self) -> None:
+        while not self._stop_flushing.wait(settings.METRICS_FLUSH_SECONDS):
+            try:
+                self.flush()
+            except OSError as exc:
+                print(exc)
+        self.flush()
+
+    def start_flushing(self) -> None:
+        """Flushes every METRICS_FLUSH_SECONDS from a thread, never from requests"""
+        if not settings.METRICS_MULTIPROC_DIR or self._flusher is not None:
+            return
+
+        self._stop_flushing.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name="metrics-flush", daemon=True
+        )
+        self._flusher.start()
+
+    def stop_flushing(self) -> None:
+        """Stops the flushing thread once it wrote a last snapshot"""
+        if self._flusher is None:
+            return
+
+        self._stop_flushing.set()
+        self._flusher.join()
+        self._flusher = None
+
+    def collect(self) -> dict[str, Family]:
+        """Returns the families of every worker process, summed, or just this process"""
+        if not settings.METRICS_MULTIPROC_DIR:
+            return self.snapshot()
+
+        # ? This process is read live, its file may be METRICS_FLUSH_SECONDS old
+        merged = self.snapshot()
+        lock_path = os.path.join(settings.METRICS_MULTIPROC_DIR, METRICS_LOCK_FILE)
+        with open(lock_path, "ab") as lock_file:
+            # ? Workers scraping together would archive a dead worker twice
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                archive_path = os.path.join(
+                    settings.METRICS_MULTIPROC_DIR, METRICS_ARCHIVE_FILE
+                )
+                archive = _read_snapshot(archive_path) or {}
+                dead_paths = []
+
+                for path, pid, families in _read_snapshots():
+                    if pid == os.getpid():
+                        continue
+                    if _pid_is_alive(pid):
+                        _merge(merged, families)
+                        continue
+                    # ? Counters of dead workers still count, their gauges don't.
+                    # ? Folded into the archive: recycled workers (SERVER_MAX_REQUESTS)
+                    # ? would otherwise leave one more file to read on every scrape
+                    _merge(
+                        archive,
+                        {
+                            name: family
+                            for name, family in families.items()
+                            if family["type"] != "gauge"
+                        },
+                    )
+                    dead_paths.append(path)
+
+                if dead_paths:
+                    _write_snapshot(archive_path, archive)
+                    for path in dead_paths:
+                        os.remove(path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        _merge(merged, archive)
+        return merged
+
+    def render(self) -> str:
+        """Returns every family in the Prometheus text exposition format"""
+        lines = []
+        for name, family in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            lines.extend(
+                f"{sample} {value}" for sample, value in family["samples"].items()
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
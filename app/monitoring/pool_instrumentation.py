@@ -0,0 +1,85 @@
+""" Connection Pool Instrumentation """
+import time
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.monitoring.metrics_registry import Family, metrics
+
+POOL_WAIT = "db_pool_wait_seconds"
+POOL_TIMEOUTS = "db_pool_timeouts_total"
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class _TimedPoolMixin:
+    """Times every connection checkout, including the wait for a free connection"""
+
+    label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.inc(
+                POOL_TIMEOUTS, "Checkouts that hit pool_timeout", {"pool": self.label}
+            )
+            raise
+        finally:
+            metrics.observe(
+                POOL_WAIT,
+                "Time waited for a pooled connection",
+                {"pool": self.label},
+                time.perf_counter() - start,
+                POOL_WAIT_BUCKETS,
+            )
+
+
+def timed_pool_class(label: str, is_async: bool = False) -> type[QueuePool]:
+    """Returns a QueuePool (or AsyncAdaptedQueuePool) class recording checkout wait times"""
+    # ? The label lives on the class: engine.dispose() recreates the pool from it
+    base_pool = AsyncAdaptedQueuePool if is_async else QueuePool
+    return type(
+        f"Timed{base_pool.__name__}", (_TimedPoolMixin, base_pool), {"label": label}
+    )
+
+
+TimedQueuePool = timed_pool_class("sync")
+TimedAsyncQueuePool = timed_pool_class("async", is_async=True)
+
+
+def pool_stats_collector(*engines: Engine) -> dict[str, Family]:
+    """Exposes size, checked out and overflow connections of each engine pool"""
+    families: dict[str, Family] = {
+        "db_pool_size": {
+            "type": "gauge",
+            "help": "Connections kept open by the pool",
+            "samples": {},
+        },
+        "db_pool_checked_out": {
+            "type": "gauge",
+            "help": "Connections currently in use",
+            "samples": {},
+        },
+        "db_pool_overflow": {
+            "type": "gauge",
+            "help": "Connections opened beyond pool_size",
+            "samples": {},
+        },
+    }
+
+    for engine in engines:
+        pool = engine.pool
+        label = getattr(pool, "label", type(pool).__name__)
+        sample_labels = f'{{pool="{label}"}}'
+        families["db_pool_size"]["samples"][
+            f"db_pool_size{sample_labels}"
+        ] = pool.size()
+        families["db_pool_checked_out"]["samples"][
+            f"db_pool_checked_out{sample_labels}"
+        ] = pool.checkedout()
+        # ? overflow() starts at -pool_size and only goes positive past it
+        families["db_pool_overflow"]["samples"][
+            f"db_pool_overflow{sample_labels}"
+        ] = max(pool.overflow(), 0)
+
+    return families
@@ -0,0 +1,161 @@
+""" SQL Instrumentation """
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Any
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.monitoring.metrics_registry import metrics
+from app.settings import settings
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+STATEMENTS_TOTAL = "db_statements_total"
+STATEMENT_DURATION = "db_statement_duration_seconds"
+REQUEST_STATEMENTS = "db_request_statements"
+REQUEST_DB_DURATION = "db_request_duration_seconds"
+STATEMENT_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|%s|\?")
+# ? asyncpg casts each of them: IN ($1::INTEGER, $2::INTEGER)
+_IN_LIST = re.compile(r"\(\s*\?(?:::\w+)?(?:\s*,\s*\?(?:::\w+)?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestDbStats:
+    """Statements issued by the current request and the time spent running them"""
+
+    __slots__ = ("statements", "duration")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+
+
+# ? Set per request by DbTimingMiddleware; run_sync greenlets and copy_context()
+# ? worker threads share the same RequestDbStats object
+current_db_stats: ContextVar[RequestDbStats | None] = ContextVar(
+    "current_db_stats", default=None
+)
+
+
+def normalize_sql(statement: str) -> str:
+    """Strips literals and placeholders so equivalent statements group together"""
+    statement = _STRING_LITERAL.sub("?", statement)
+    # ? Placeholders before numbers: asyncpg's $1 would become $? otherwise
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    # ? IN (?, ?, ?) and IN (?) are the same query
+    statement = _IN_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def params_shape(parameters: Any) -> Any:
+    """Parameter names and types only, values (passwords, emails) never hit the logs"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # ? executemany
+            return f"{len(parameters)} x {params_shape(parameters[0])}"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _operation(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # ? On the statement's own execution context: a failed statement (no
+    # ? after_cursor_execute) leaves nothing behind on the connection
+    context.query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.query_start_time
+
+    db_stats = current_db_stats.get()
+    if db_stats is not None:
+        db_stats.statements += 1
+        db_stats.duration += duration
+
+    operation = _operation(statement)
+    metrics.inc(STATEMENTS_TOTAL, "SQL statements executed", {"operation": operation})
+    metrics.observe(
+        STATEMENT_DURATION,
+        "SQL statement latency",
+        {"operation": operation},
+        duration,
+    )
+
+    if (
+        settings.DB_SLOW_QUERY_SECONDS is not None
+        and duration >= settings.DB_SLOW_QUERY_SECONDS
+    ):
+        slow_query_logger.warning(
+            "Slow query (%.1f ms): %s | params: %s",
+            duration * 1000,
+            normalize_sql(statement),
+            params_shape(parameters),
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Hooks statement count, timing and slow query logging into a (sync) Engine"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class DbTimingMiddleware:
+    """Pure ASGI middleware attributing DB statements and time to each request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        db_stats = RequestDbStats()
+        token = current_db_stats.set(db_stats)
+
+        async def send_with_server_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f"db;dur={db_stats.duration * 1000:.1f};"
+                    f'desc="{db_stats.statements} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            current_db_stats.reset(token)
+
+            route = scope.get("route")
+            if db_stats.statements and route is not None:
+                labels = {"method": scope["method"], "route": route.path}
+                metrics.observe(
+                    REQUEST_STATEMENTS,
+                    "SQL statements per request",
+                    labels,
+                    db_stats.statements,
+                    STATEMENT_COUNT_BUCKETS,
+                )
+                metrics.observe(
+                    REQUEST_DB_DURATION,
+                    "Time spent in SQL per request",
+                    labels,
+                    db_stats.duration,
+                )
@@ -1,11 +1,71 @@
 """ Posts Repository """
-from typing import Optional, List, Tuple
-from sqlalchemy import func, desc
-from sqlalchemy.orm import Session
+from typing import AsyncIterator, Iterator, Optional, List, Sequence, Tuple
+from sqlalchemy import (
+    Row,
+    Select,
+    and_,
+    cast,
+    delete,
+    desc,
+    exists,
+    func,
+    null,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import REAL
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from app.models.posts_model import PostModel
-from app.models.votes_model import VoteModel
+from app.models.users_model import UserModel
 from app.schemas.users_schemas import UserOut
 
+# ? PostOut nests the owner: JOIN it in the same SELECT instead of one lazy load per owner
+WITH_OWNER = joinedload(PostModel.owner, innerjoin=True)
+
+# ? Every PostOut field, owner ones prefixed with "owner_", and the row versions
+POST_ROW_COLUMNS = (
+    PostModel.title,
+    PostModel.content,
+    PostModel.published,
+    PostModel.rating,
+    PostModel.id,
+    PostModel.created_at,
+    PostModel.vote_count.label("n_votes"),
+    UserModel.email.label("owner_email"),
+    UserModel.password.label("owner_password"),
+    UserModel.phone_number.label("owner_phone_number"),
+    UserModel.id.label("owner_id"),
+    UserModel.created_at.label("owner_created_at"),
+    PostModel.version,
+    UserModel.version.label("owner_version"),
+)
+
+# ? PostOut fields of the post itself, the owner is known to be the current user
+POST_OWNED_COLUMNS = (
+    PostModel.title,
+    PostModel.content,
+    PostModel.published,
+    PostModel.rating,
+    PostModel.id,
+    PostModel.created_at,
+    PostModel.vote_count.label("n_votes"),
+    PostModel.version,
+)
+
+# ? Flat export shape: the owner is just its id and no password hash leaves the DB
+POST_EXPORT_COLUMNS = (
+    PostModel.id,
+    PostModel.title,
+    PostModel.content,
+    PostModel.published,
+    PostModel.rating,
+    PostModel.created_at,
+    PostModel.owner_id,
+    PostModel.vote_count.label("n_votes"),
+)
+
 # * GET
 
 
@@ -36,25 +96,46 @@ def get_posts_with_n_votes(
     skip: int,
     limit: int,
     search: Optional[str],
-) -> List[Tuple[PostModel, int]]:
-    """Get Posts With Number Of Votes"""
-    db_posts = (
-        db_session.query(PostModel, func.count(VoteModel.post_id).label("n_votes"))
-        .filter(
-            PostModel.title.contains(search),
-        )
-        .join(
-            VoteModel,
-            PostModel.id == VoteModel.post_id,
-            isouter=True,
+    after_id: Optional[int] = None,
+    after_rank: Optional[float] = None,
+) -> List[Row]:
+    """Get Posts With Number Of Votes, as plain POST_ROW_COLUMNS rows plus their rank"""
+    # ? Plain columns, no ORM entities: nothing to hydrate nor track in the identity map
+    query = db_session.query(*POST_ROW_COLUMNS)
+
+    if not search:
+        query = query.add_columns(null().label("rank")).join(PostModel.owner)
+
+        # ? Keyset pagination: seek past the last seen id through the pkey index,
+        # ? instead of making Postgres walk and discard "skip" rows
+        if after_id is not None:
+            query = query.filter(PostModel.id > after_id)
+
+        query = query.order_by(PostModel.id)
+    else:
+        rank = func.word_similarity(search, PostModel.title)
+        query = (
+            query.add_columns(rank.label("rank"))
+            .join(PostModel.owner)
+            .filter(
+                # ? Served by the ix_posts_title_trgm GIN index
+                PostModel.title.icontains(search, autoescape=True),
+            )
         )
-        .group_by(PostModel.id)
-        .order_by(PostModel.id)
-        .limit(limit)
-        .offset(skip)
-    ).all()
 
-    return db_posts
+        if after_id is not None:
+            # ? rank is a REAL, compare as REAL or the float8 param never equals it
+            last_rank = cast(after_rank, REAL)
+            query = query.filter(
+                or_(rank < last_rank, and_(rank == last_rank, PostModel.id > after_id))
+            )
+
+        query = query.order_by(desc(rank), PostModel.id)
+
+    if after_id is None:
+        query = query.offset(skip)
+
+    return query.limit(limit).all()
 
 
 def get_post_by_id(
@@ -62,7 +143,12 @@ def get_post_by_id(
     post_id: int,
 ) -> PostModel | None:
     """Get Post By Id"""
-    db_post = db_session.query(PostModel).filter(PostModel.id == post_id).first()
+    db_post = (
+        db_session.query(PostModel)
+        .options(WITH_OWNER)
+        .filter(PostModel.id == post_id)
+        .first()
+    )
 
     return db_post
 
@@ -73,20 +159,29 @@ def get_post_by_id_with_n_votes(
 ) -> Tuple[PostModel, int] | None:
     """Get Post By Id With Number Of Votes"""
     db_post = (
-        db_session.query(PostModel, func.count(VoteModel.post_id).label("n_votes"))
+        db_session.query(PostModel, PostModel.vote_count.label("n_votes"))
+        .options(WITH_OWNER)
         .filter(PostModel.id == post_id)
-        .join(
-            VoteModel,
-            PostModel.id == VoteModel.post_id,
-            isouter=True,
-        )
-        .group_by(PostModel.id)
         .first()
     )
 
     return db_post
 
 
+def get_posts_by_ids_with_n_votes(
+    db_session: Session,
+    post_ids: Sequence[int],
+) -> List[Row]:
+    """Get Posts By Ids With Number Of Votes, as POST_ROW_COLUMNS rows in one query"""
+    db_posts = (
+        db_session.query(*POST_ROW_COLUMNS)
+        .join(PostModel.owner)
+        .filter(PostModel.id.in_(post_ids))
+    ).all()
+
+    return db_posts
+
+
 def get_latest_post(
     db_session: Session,
 ) -> PostModel | None:
@@ -101,15 +196,88 @@ def get_latest_post_with_n_votes(
 ) -> Tuple[PostModel, int] | None:
     """Get Latest Post"""
     db_post = (
-        db_session.query(PostModel, func.count(VoteModel.post_id).label("n_votes"))
-        .join(
-            VoteModel,
-            PostModel.id == VoteModel.post_id,
-            isouter=True,
-        )
-        .group_by(PostModel.id)
+        db_session.query(PostModel, PostModel.vote_count.label("n_votes"))
+        .options(WITH_OWNER)
         .order_by(desc(PostModel.id))
         .first()
     )
 
     return db_post
+
+
+def post_exists(db_session: Session, post_id: int) -> bool:
+    """Checks whether a Post exists, without loading it"""
+    return db_session.scalar(select(exists().where(PostModel.id == post_id)))
+
+
+def get_post_versions(db_session: Session, post_id: int) -> Row | None:
+    """Get the version of a Post and of its owner, all its ETag needs"""
+    return db_session.execute(
+        select(PostModel.version, UserModel.version.label("owner_version"))
+        .join(PostModel.owner)
+        .where(PostModel.id == post_id)
+    ).first()
+
+
+def _posts_export_statement(batch_size: int) -> Select:
+    # ? yield_per -> server side cursor, at most batch_size rows buffered at a time
+    return (
+        select(*POST_EXPORT_COLUMNS)
+        .order_by(PostModel.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def stream_posts_with_n_votes(
+    db_session: Session,
+    batch_size: int,
+) -> Iterator[Sequence[Row]]:
+    """Stream every Post With Number Of Votes, in batches of POST_EXPORT_COLUMNS rows"""
+    result = db_session.execute(_posts_export_statement(batch_size))
+
+    yield from result.partitions()
+
+
+async def astream_posts_with_n_votes(
+    db_session: AsyncSession,
+    batch_size: int,
+) -> AsyncIterator[Sequence[Row]]:
+    """Async version of stream_posts_with_n_votes"""
+    result = await db_session.stream(_posts_export_statement(batch_size))
+
+    async for partition in result.partitions():
+        yield partition
+
+
+# * PUT
+
+
+def update_owned_post(
+    db_session: Session,
+    post_id: int,
+    owner_id: int,
+    values: dict,
+) -> Row | None:
+    """Update a Post only if owner_id owns it, returns its POST_OWNED_COLUMNS or None"""
+    # ? UPDATE ... WHERE id AND owner_id RETURNING: ownership check, write and read back
+    # ? in a single round trip
+    return db_session.execute(
+        update(PostModel)
+        .where(PostModel.id == post_id, PostModel.owner_id == owner_id)
+        .values({**values, "version": PostModel.version + 1})
+        .returning(*POST_OWNED_COLUMNS)
+    ).first()
+
+
+# * DELETE
+
+
+def delete_owned_post(db_session: Session, post_id: int, owner_id: int) -> bool:
+    """Delete a Post only if owner_id owns it, returns whether it was deleted"""
+    deleted_id = db_session.execute(
+        delete(PostModel)
+        .where(PostModel.id == post_id, PostModel.owner_id == owner_id)
+        .returning(PostModel.id)
+    ).scalar()
+
+    return deleted_id is not None
@@ -1,20 +1,37 @@
 """ Users Repository """
+from typing import Sequence
+from sqlalchemy import Row, delete, exists, select, update
 from sqlalchemy.orm import Session
 from app.models.users_model import UserModel
 
+# ? Every UserOut field
+USER_ROW_COLUMNS = (
+    UserModel.email,
+    UserModel.password,
+    UserModel.phone_number,
+    UserModel.id,
+    UserModel.created_at,
+)
+
 
 # * GET
 
 
-def get_users(db_session: Session, skip: int, limit: int) -> list[UserModel]:
-    """Get Users"""
-    db_users = (
-        db_session.query(UserModel)
-        .order_by(UserModel.id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+def get_users(
+    db_session: Session, skip: int, limit: int, after_id: int | None = None
+) -> list[Row]:
+    """Get Users, as plain USER_ROW_COLUMNS rows"""
+    query = db_session.query(*USER_ROW_COLUMNS)
+
+    # ? Keyset pagination, same as posts_repository.get_posts_with_n_votes
+    if after_id is not None:
+        query = query.filter(UserModel.id > after_id)
+
+    query = query.order_by(UserModel.id)
+    if after_id is None:
+        query = query.offset(skip)
+
+    db_users = query.limit(limit).all()
 
     return db_users
 
@@ -26,8 +43,54 @@ def get_user_by_id(db_session: Session, user_id: int) -> UserModel | None:
     return db_user
 
 
+def get_users_by_ids(db_session: Session, user_ids: Sequence[int]) -> list[Row]:
+    """Get Users By Ids, as USER_ROW_COLUMNS rows plus their version in one query"""
+    db_users = (
+        db_session.query(*USER_ROW_COLUMNS, UserModel.version).filter(
+            UserModel.id.in_(user_ids)
+        )
+    ).all()
+
+    return db_users
+
+
 def get_user_by_email(db_session: Session, user_email: str) -> UserModel | None:
     """Get User By Email"""
     db_user = db_session.query(UserModel).filter(UserModel.email == user_email).first()
 
     return db_user
+
+
+def get_user_version(db_session: Session, user_id: int) -> int | None:
+    """Get the version of a User, all its ETag needs"""
+    return db_session.scalar(select(UserModel.version).where(UserModel.id == user_id))
+
+
+def user_exists(db_session: Session, user_id: int) -> bool:
+    """Checks whether a User exists, without loading it"""
+    return db_session.scalar(select(exists().where(UserModel.id == user_id)))
+
+
+# * PUT
+
+
+def update_user(db_session: Session, user_id: int, values: dict) -> Row | None:
+    """Update a User, returns its USER_ROW_COLUMNS and version, None if it doesn't exist"""
+    return db_session.execute(
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values({**values, "version": UserModel.version + 1})
+        .returning(*USER_ROW_COLUMNS, UserModel.version)
+    ).first()
+
+
+# * DELETE
+
+
+def delete_user(db_session: Session, user_id: int) -> bool:
+    """Delete a User, returns whether it existed"""
+    deleted_id = db_session.execute(
+        delete(UserModel).where(UserModel.id == user_id).returning(UserModel.id)
+    ).scalar()
+
+    return deleted_id is not None
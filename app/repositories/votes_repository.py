@@ -1,20 +1,74 @@
 """ Votes Repository """
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
+from app.models.posts_model import PostModel
 from app.models.votes_model import VoteModel
-from app.schemas.votes_schemas import VotePayload
-
-
-def get_vote(
-    db_session: Session,
-    vote: VotePayload,
-) -> VoteModel | None:
-    """Get Vote"""
-    db_vote = (
-        db_session.query(VoteModel)
-        .filter(
-            VoteModel.post_id == vote.post_id,
-        )
-        .first()
+
+
+# * POST
+
+
+def create_vote(db_session: Session, user_id: int, post_id: int) -> bool:
+    """Create Vote and increment its post vote_count, False if already voted"""
+    # ? One statement, no commit. A missing post raises IntegrityError on the FK
+    inserted_vote = (
+        insert(VoteModel)
+        .values(user_id=user_id, post_id=post_id)
+        .on_conflict_do_nothing()
+        .returning(VoteModel.post_id)
+        .cte("inserted_vote")
+    )
+    db_post_id = db_session.execute(
+        update(PostModel)
+        .where(PostModel.id == inserted_vote.c.post_id)
+        .values(vote_count=PostModel.vote_count + 1, version=PostModel.version + 1)
+        .returning(PostModel.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+    return db_post_id is not None
+
+
+# * DELETE
+
+
+def delete_vote(db_session: Session, user_id: int, post_id: int) -> bool:
+    """Delete Vote and decrement its post vote_count, False if there was none"""
+    # ? One statement, no commit
+    deleted_vote = (
+        delete(VoteModel)
+        .where(VoteModel.user_id == user_id, VoteModel.post_id == post_id)
+        .returning(VoteModel.post_id)
+        .cte("deleted_vote")
+    )
+    db_post_id = db_session.execute(
+        update(PostModel)
+        .where(PostModel.id == deleted_vote.c.post_id)
+        .values(vote_count=PostModel.vote_count - 1, version=PostModel.version + 1)
+        .returning(PostModel.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+    return db_post_id is not None
+
+
+def delete_user_votes(db_session: Session, user_id: int) -> list[int]:
+    """Delete every Vote of a User, decrement and bump the version of their posts,
+    returns the ids of those posts"""
+    # ? Deleting the user would cascade to its votes behind vote_count's back
+    deleted_votes = (
+        delete(VoteModel)
+        .where(VoteModel.user_id == user_id)
+        .returning(VoteModel.post_id)
+        .cte("deleted_votes")
     )
+    db_post_ids = db_session.execute(
+        update(PostModel)
+        .where(PostModel.id == deleted_votes.c.post_id)
+        .values(vote_count=PostModel.vote_count - 1, version=PostModel.version + 1)
+        .returning(PostModel.id)
+        .execution_options(synchronize_session=False)
+    ).scalars()
 
-    return db_vote
+    return list(db_post_ids)
@@ -1,8 +1,9 @@
 """ Posts Schemas """
 # ? pydantic is useful for data validation (request body/params) + schema definition
 from datetime import datetime
+from enum import Enum
 from typing import Optional
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from .users_schemas import UserOut
 
 
@@ -32,3 +33,12 @@ class PostOut(PostBase):
     owner: UserOut
     # ? Needed to be excluded when converted to SqlAlchemy PostModel
     n_votes: int = 0
+    # ? Row version, only used to build ETags: never part of the response body
+    version: int = Field(default=0, exclude=True)
+
+
+class PostExportFormat(str, Enum):
+    """PostExportFormat Enum Class"""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
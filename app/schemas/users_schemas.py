@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 class UserBase(BaseModel):
@@ -24,3 +24,5 @@ class UserOut(UserBase):
 
     id: int
     created_at: datetime
+    # ? Row version, only used to build ETags: never part of the response body
+    version: int = Field(default=0, exclude=True)
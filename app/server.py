@@ -0,0 +1,118 @@
+""" Production Server Entrypoint
+
+    python -m app.server
+
+Gunicorn master + SERVER_WORKERS uvicorn workers (one per core by default), on
+uvloop and httptools. SIGTERM drains in-flight requests for up to
+SERVER_GRACEFUL_TIMEOUT seconds before the workers run the lifespan shutdown.
+"""
+import os
+import tempfile
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+from app.settings import settings
+
+
+def default_workers() -> int:
+    """Cores this process may run on, cgroup/affinity limits included"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class TunedUvicornWorker(UvicornWorker):
+    """UvicornWorker pinned to the fast event loop and HTTP parser"""
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        # ? Above this many connections/tasks new requests get a 503 instead of queueing
+        "limit_concurrency": settings.SERVER_LIMIT_CONCURRENCY,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT,
+    }
+
+
+def post_fork(server, worker) -> None:
+    """Drops any pooled connection inherited from the preloading master"""
+    # pylint: disable=import-outside-toplevel,unused-argument
+    from app.database.db_config import (
+        AsyncEngine,
+        AsyncReadEngine,
+        Engine,
+        ReadEngine,
+    )
+
+    # ? close=False -> don't close the parent's sockets, just forget them
+    for engine in {
+        Engine,
+        ReadEngine,
+        AsyncEngine.sync_engine,
+        AsyncReadEngine.sync_engine,
+    }:
+        engine.dispose(close=False)
+
+
+def on_exit(server) -> None:
+    """Removes the shared memory caches once every worker is gone"""
+    # pylint: disable=import-outside-toplevel,unused-argument
+    from app.cache.shared_memory_backend import unlink_segments
+
+    # ? By name: without preload only the workers attached to the segments, the
+    # ? master never built the caches it would otherwise unlink
+    if settings.CACHE_BACKEND == "shared_memory":
+        unlink_segments(f"{settings.CACHE_NAMESPACE}_", settings.CACHE_SHM_LOCK_DIR)
+
+
+class Server(BaseApplication):
+    """Gunicorn application configured from Settings instead of CLI flags"""
+
+    def __init__(self, app_uri: str, options: dict):
+        self.app_uri = app_uri
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # pylint: disable=import-outside-toplevel
+        from gunicorn.util import import_app
+
+        return import_app(self.app_uri)
+
+
+def server_options() -> dict:
+    """Gunicorn settings, see https://docs.gunicorn.org/en/stable/settings.html"""
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": settings.SERVER_WORKERS or default_workers(),
+        "worker_class": "app.server.TunedUvicornWorker",
+        "backlog": settings.SERVER_BACKLOG,
+        "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+        "timeout": settings.SERVER_TIMEOUT,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        # ? Import once in the master, workers fork with the app already loaded
+        "preload_app": settings.SERVER_PRELOAD,
+        "post_fork": post_fork,
+        "on_exit": on_exit,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS // 10,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+
+
+def main() -> None:
+    options = server_options()
+
+    # ? Several workers -> /metrics must merge them, each worker dumps its own file
+    if options["workers"] > 1 and not settings.METRICS_MULTIPROC_DIR:
+        settings.METRICS_MULTIPROC_DIR = tempfile.mkdtemp(prefix="metrics_")
+
+    Server("app.main:app", options).run()
+
+
+if __name__ == "__main__":
+    main()
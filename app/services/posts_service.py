@@ -1,70 +1,386 @@
 """ Posts Service """
-from typing import Optional
+import asyncio
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional, Sequence
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.cache import create_cache
+from app.cache.codecs import PostCodec
+from app.database.db_config import (
+    routed_to_primary,
+    run_in_new_session,
+    run_in_session,
+)
 from app.repositories import posts_repository
 from app.exceptions.http_exceptions import (
     ForbiddenException,
     NotFoundException,
 )
 from app.models.posts_model import PostModel
-from app.schemas.posts_schemas import PostOut, PostUpsert
+from app.schemas.posts_schemas import PostExportFormat, PostOut, PostUpsert
 from app.schemas.users_schemas import UserOut
+from app.settings import settings
+from app.utils import json_utils
+from app.utils.cursor_utils import encode_cursor, get_cursor_id, get_cursor_rank
+from app.utils.etag_utils import etag_matches, hash_etag, make_etag
+from app.utils.single_flight_utils import SingleFlight
+
+EXPORT_BATCH_SIZE = 1000
+LATEST_POST_KEY = "latest"
+
+# ? PostOut by post id, plus the latest post under LATEST_POST_KEY.
+# ? Writes invalidate it precisely, the TTL bounds what a lagging read replica may leave
+post_cache = create_cache(
+    "post", settings.POST_CACHE_MAX_SIZE, settings.POST_CACHE_TTL_SECONDS, PostCodec()
+)
+# ? Hot reads that a burst of clients may miss at once (e.g. right after a write
+# ? invalidated them): concurrent identical calls share a single query
+latest_post_flight = SingleFlight("latest_post")
+posts_first_page_flight = SingleFlight("posts_first_page")
 
 # * GET
 
 
+def _get_cached_post(db_session: Session | AsyncSession, key: int | str):
+    # ? A lagging replica read may have cached what preceded the user's own write:
+    # ? read your writes sessions neither read nor fill post_cache
+    if routed_to_primary(db_session):
+        return None
+    return post_cache.get(key)
+
+
+def _cache_post(
+    db_session: Session, key: int | str, post_schema: PostOut, cache_version: int
+) -> None:
+    if not routed_to_primary(db_session):
+        post_cache.set(key, post_schema, cache_version)
+
+
+def post_row_to_payload(post_row: Row) -> dict:
+    """Builds the PostOut shaped payload of a posts_repository.POST_ROW_COLUMNS row"""
+    return {
+        "title": post_row.title,
+        "content": post_row.content,
+        "published": post_row.published,
+        "rating": post_row.rating,
+        "id": post_row.id,
+        "created_at": post_row.created_at,
+        "owner": {
+            "email": post_row.owner_email,
+            "password": post_row.owner_password,
+            "phone_number": post_row.owner_phone_number,
+            "id": post_row.owner_id,
+            "created_at": post_row.owner_created_at,
+        },
+        "n_votes": post_row.n_votes,
+    }
+
+
+def post_row_to_schema(post_row: Row) -> PostOut:
+    """Builds the PostOut of a posts_repository.POST_ROW_COLUMNS row, versions included"""
+    payload = post_row_to_payload(post_row)
+    payload["version"] = post_row.version
+    payload["owner"]["version"] = post_row.owner_version
+
+    return PostOut.model_validate(payload)
+
+
+def post_etag(post_id: int, version: int, owner_version: int) -> str:
+    """ETag of a PostOut, it changes with the post and with its embedded owner"""
+    return make_etag(post_id, version, owner_version)
+
+
+def posts_etag(posts: list[PostOut]) -> str:
+    """ETag of a list of PostOut"""
+    return hash_etag((post.id, post.version, post.owner.version) for post in posts)
+
+
 def get_posts_with_n_votes(
     db_session: Session,
     skip: int,
     limit: int,
     search: Optional[str],
-) -> list[PostOut]:
-    """Get Posts With Number Of Votes"""
-    db_posts = posts_repository.get_posts_with_n_votes(db_session, skip, limit, search)
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+) -> tuple[Optional[list[dict]], Optional[str], str]:
+    """Get Posts With Number Of Votes as PostOut payloads, plus the cursor of the next
+    page and the ETag of the page. No payloads when if_none_match matches it"""
+    after_id, after_rank = None, None
+    if cursor:
+        after_id = get_cursor_id(cursor)
+        # ? Searches are ranked, so their cursor carries the rank of the last post too
+        if search:
+            after_rank = get_cursor_rank(cursor)
+
+    post_rows = posts_repository.get_posts_with_n_votes(
+        db_session, skip, limit, search, after_id, after_rank
+    )
+
+    # ? A short page means there is nothing left to fetch
+    next_cursor = None
+    if post_rows and len(post_rows) == limit:
+        sort_key = {"id": post_rows[-1].id}
+        if search:
+            sort_key["rank"] = post_rows[-1].rank
+        next_cursor = encode_cursor(sort_key)
+
+    # ? Row versions are enough to tell whether the page changed: a match skips
+    # ? building and serializing the payloads
+    etag = hash_etag(
+        [(row.id, row.version, row.owner_version) for row in post_rows]
+        + [(next_cursor,)]
+    )
+    if etag_matches(if_none_match, etag):
+        return None, next_cursor, etag
+
+    # ? Rows come straight from the DB: no per row PostOut validation, the API
+    # ? serializes these dicts once with orjson
+    posts = [post_row_to_payload(post_row) for post_row in post_rows]
+
+    return posts, next_cursor, etag
+
+
+async def get_posts_with_n_votes_coalesced(
+    db_session: Session | AsyncSession,
+    skip: int,
+    limit: int,
+    search: Optional[str],
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+) -> tuple[Optional[list[dict]], Optional[str], str]:
+    """get_posts_with_n_votes, concurrent requests for the same first page share one
+    DB query and its result"""
+    if skip or cursor:
+        return await run_in_session(
+            db_session,
+            get_posts_with_n_votes,
+            skip,
+            limit,
+            search,
+            cursor,
+            if_none_match,
+        )
 
-    posts = []
+    # ? Normalized: ILIKE and word_similarity ignore case, no search == empty search.
+    # ? The bind keeps primary reads (read your writes) apart from replica ones
+    key = (limit, (search or "").lower(), db_session.bind)
+    # ? Its own session: the flight may outlive the request (and session) starting it
+    posts, next_cursor, etag = await posts_first_page_flight.run(
+        key,
+        lambda: run_in_new_session(
+            db_session.bind, get_posts_with_n_votes, 0, limit, search
+        ),
+    )
 
-    for post_model, n_votes in db_posts:
-        post_schema = PostOut.model_validate(post_model)
-        post_schema.n_votes = n_votes
-        posts.append(post_schema)
+    # ? Compared per caller, the shared result doesn't depend on If-None-Match
+    if etag_matches(if_none_match, etag):
+        return None, next_cursor, etag
 
-    return posts
+    return posts, next_cursor, etag
 
 
 def get_post_by_id_with_n_votes(
     db_session: Session,
     post_id: int,
 ) -> PostOut:
-    """Get Post By Id With Number Of Votes"""
-    try:
-        post_model, n_votes = posts_repository.get_post_by_id_with_n_votes(
-            db_session, post_id
-        )
+    """Get Post By Id With Number Of Votes, read through post_cache"""
+    post_schema = _get_cached_post(db_session, post_id)
+    if post_schema is not None:
+        return post_schema
 
-        post_schema = PostOut.model_validate(post_model)
-        post_schema.n_votes = n_votes
+    return _load_post(db_session, post_id)
 
-        return post_schema
-    except TypeError as exc_404:
-        raise NotFoundException(f"Post with id: {post_id} not found") from exc_404
+
+def get_post_by_id_if_none_match(
+    db_session: Session,
+    post_id: int,
+    if_none_match: Optional[str],
+) -> tuple[Optional[PostOut], str]:
+    """Get Post By Id With Number Of Votes and its ETag, no Post when if_none_match
+    matches it"""
+    post_schema = _get_cached_post(db_session, post_id)
+
+    if post_schema is None and if_none_match:
+        # ? Versions only: a 304 needs neither the full row nor its owner
+        versions = posts_repository.get_post_versions(db_session, post_id)
+        if versions is not None:
+            etag = post_etag(post_id, *versions)
+            if etag_matches(if_none_match, etag):
+                return None, etag
+
+    if post_schema is None:
+        post_schema = _load_post(db_session, post_id)
+
+    etag = post_etag(post_schema.id, post_schema.version, post_schema.owner.version)
+    if etag_matches(if_none_match, etag):
+        return None, etag
+
+    return post_schema, etag
+
+
+def get_posts_by_ids_with_n_votes(
+    db_session: Session,
+    post_ids: list[int],
+) -> list[PostOut]:
+    """Get Posts By Ids With Number Of Votes in post_ids order, read through
+    post_cache: the missing ones in a single query. Posts that don't exist are left out
+    """
+    posts = {}
+    missing_ids = []
+    for post_id in post_ids:
+        post_schema = _get_cached_post(db_session, post_id)
+        if post_schema is None:
+            missing_ids.append(post_id)
+        else:
+            posts[post_id] = post_schema
+
+    if missing_ids:
+        cache_version = post_cache.version
+        for post_row in posts_repository.get_posts_by_ids_with_n_votes(
+            db_session, missing_ids
+        ):
+            post_schema = post_row_to_schema(post_row)
+            posts[post_schema.id] = post_schema
+            _cache_post(db_session, post_schema.id, post_schema, cache_version)
+
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+def _load_post(db_session: Session, post_id: int) -> PostOut:
+    cache_version = post_cache.version
+    db_post = posts_repository.get_post_by_id_with_n_votes(db_session, post_id)
+
+    if not db_post:
+        raise NotFoundException(f"Post with id: {post_id} not found")
+
+    post_model, n_votes = db_post
+    post_schema = PostOut.model_validate(post_model)
+    post_schema.n_votes = n_votes
+    _cache_post(db_session, post_id, post_schema, cache_version)
+
+    return post_schema
 
 
 def get_latest_post_with_n_votes(
     db_session: Session,
 ) -> PostOut:
-    """Get Latest Post With Number Of Votes"""
-    post_model, n_votes = posts_repository.get_latest_post_with_n_votes(db_session)
+    """Get Latest Post With Number Of Votes, read through post_cache"""
+    post_schema = _get_cached_post(db_session, LATEST_POST_KEY)
+    if post_schema is not None:
+        return post_schema
 
-    if not post_model:
+    return _load_latest_post(db_session)
+
+
+async def get_latest_post_with_n_votes_coalesced(
+    db_session: Session | AsyncSession,
+) -> PostOut:
+    """get_latest_post_with_n_votes, concurrent cache misses share one DB query"""
+    # ? Checked before run_in_session -> a hit costs no DB round trip nor thread hop,
+    # ? unless the cache itself is remote: its round trip must not block the loop
+    if post_cache.is_remote:
+        post_schema = await asyncio.to_thread(
+            _get_cached_post, db_session, LATEST_POST_KEY
+        )
+    else:
+        post_schema = _get_cached_post(db_session, LATEST_POST_KEY)
+    if post_schema is not None:
+        return post_schema
+
+    # ? Its own session: the flight may outlive the request (and session) starting it
+    return await latest_post_flight.run(
+        db_session.bind, lambda: run_in_new_session(db_session.bind, _load_latest_post)
+    )
+
+
+def _load_latest_post(db_session: Session) -> PostOut:
+    cache_version = post_cache.version
+    db_post = posts_repository.get_latest_post_with_n_votes(db_session)
+
+    if not db_post:
         raise NotFoundException("Latest post not found")
 
+    post_model, n_votes = db_post
     post_schema = PostOut.model_validate(post_model)
     post_schema.n_votes = n_votes
+    _cache_post(db_session, LATEST_POST_KEY, post_schema, cache_version)
 
     return post_schema
 
 
+def invalidate_post(post_id: int) -> None:
+    """Drops a Post from post_cache, call it after committing any change to it"""
+    post_cache.delete(post_id)
+
+    latest_post = post_cache.peek(LATEST_POST_KEY)
+    if latest_post is not None and latest_post.id == post_id:
+        post_cache.delete(LATEST_POST_KEY)
+
+
+def invalidate_owner_posts(owner_id: int) -> None:
+    """Drops every cached Post of owner_id, their embedded owner is stale"""
+    post_cache.delete_where(lambda post: post.owner.id == owner_id)
+
+
+def encode_export_batch(
+    post_rows: Sequence[Row], export_format: PostExportFormat
+) -> bytes:
+    """Encodes a batch of posts_repository.POST_EXPORT_COLUMNS rows as NDJSON or CSV lines"""
+    if export_format == PostExportFormat.NDJSON:
+        return b"".join(
+            json_utils.dumps(post_row._asdict()) + b"\n" for post_row in post_rows
+        )
+
+    buffer = io.StringIO()
+    # ? Not str(): created_at reads the same as in the JSON endpoints
+    csv.writer(buffer).writerows(
+        [
+            json_utils.isoformat(value) if isinstance(value, datetime) else value
+            for value in post_row
+        ]
+        for post_row in post_rows
+    )
+    return buffer.getvalue().encode()
+
+
+def export_posts_with_n_votes(
+    db_session: Session | AsyncSession,
+    export_format: PostExportFormat,
+) -> Iterator[bytes] | AsyncIterator[bytes]:
+    """Export every Post With Number Of Votes, as a stream of encoded chunks"""
+    header = b""
+    if export_format == PostExportFormat.CSV:
+        header = encode_export_batch(
+            [[column.key for column in posts_repository.POST_EXPORT_COLUMNS]],
+            export_format,
+        )
+
+    # ? One chunk per DB batch -> memory stays flat however many posts there are
+    if isinstance(db_session, AsyncSession):
+
+        async def aiter_chunks() -> AsyncIterator[bytes]:
+            yield header
+            async for post_rows in posts_repository.astream_posts_with_n_votes(
+                db_session, EXPORT_BATCH_SIZE
+            ):
+                yield encode_export_batch(post_rows, export_format)
+
+        return aiter_chunks()
+
+    def iter_chunks() -> Iterator[bytes]:
+        # ? StreamingResponse pulls sync iterators from the thread pool
+        yield header
+        for post_rows in posts_repository.stream_posts_with_n_votes(
+            db_session, EXPORT_BATCH_SIZE
+        ):
+            yield encode_export_batch(post_rows, export_format)
+
+    return iter_chunks()
+
+
 # * POST
 
 
@@ -82,6 +398,8 @@ def create_post(
 
     db_session.commit()
     db_session.refresh(db_post)
+    # ? Becomes the latest post
+    post_cache.delete(LATEST_POST_KEY)
 
     return PostOut.model_validate(db_post)
 
@@ -96,20 +414,23 @@ def update_post(
     current_user: UserOut,
 ) -> PostOut:
     """Update Post"""
-    db_post = posts_repository.get_post_by_id(db_session, post_id)
-
-    if not db_post:
-        raise NotFoundException(f"Post with id: {post_id} not found")
-    if db_post.owner_id != current_user.id:
+    post_row = posts_repository.update_owned_post(
+        db_session,
+        post_id,
+        current_user.id,
+        post_updated.model_dump(exclude_unset=True),
+    )
+
+    if not post_row:
+        # ? Only failures pay for a second query, to tell 404 from 403
+        if not posts_repository.post_exists(db_session, post_id):
+            raise NotFoundException(f"Post with id: {post_id} not found")
         raise ForbiddenException("Not authorized to perform requested action")
 
-    for attr, value in post_updated.model_dump(exclude_unset=True).items():
-        setattr(db_post, attr, value)
-
     db_session.commit()
-    db_session.refresh(db_post)
+    invalidate_post(post_id)
 
-    return PostOut.model_validate(db_post)
+    return PostOut(**post_row._asdict(), owner=current_user)
 
 
 # * DELETE
@@ -117,14 +438,16 @@ def update_post(
 
 def delete_post(db_session: Session, post_id: int, current_user: UserOut) -> None:
     """Delete a post"""
-    db_post = posts_repository.get_post_by_id(db_session, post_id)
+    is_deleted = posts_repository.delete_owned_post(
+        db_session, post_id, current_user.id
+    )
 
-    if not db_post:
-        raise NotFoundException(f"Post with id: {post_id} not found")
-    if db_post.owner_id != current_user.id:
+    if not is_deleted:
+        if not posts_repository.post_exists(db_session, post_id):
+            raise NotFoundException(f"Post with id: {post_id} not found")
         raise ForbiddenException("Not authorized to perform requested action")
 
-    db_session.delete(db_post)
     db_session.commit()
+    invalidate_post(post_id)
 
     return None
@@ -1,23 +1,44 @@
 """ Users Service """
 from sqlalchemy.orm import Session
-from app.repositories import users_repository
+from app.repositories import users_repository, votes_repository
+from app.services.posts_service import invalidate_owner_posts, invalidate_post
 from app.models.users_model import UserModel
 from app.schemas.users_schemas import UserOut, UserUpsert
 from app.exceptions.http_exceptions import (
     ForbiddenException,
     NotFoundException,
 )
-from app.utils.password_utils import hash_password
+from app.cache import create_cache
+from app.cache.codecs import UserCodec
+from app.settings import settings
+from app.utils.cursor_utils import encode_cursor, get_cursor_id
+from app.utils.etag_utils import etag_matches, hash_etag, make_etag
+
+# ? Authenticated users by id, read by oauth2_service.get_current_user
+user_cache = create_cache(
+    "user", settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS, UserCodec()
+)
 
 
 # * GET
 
 
-def get_users(db_session: Session, skip: int, limit: int) -> list[UserOut]:
-    """Get Users"""
-    db_users = users_repository.get_users(db_session, skip, limit)
+def get_users(
+    db_session: Session, skip: int, limit: int, cursor: str | None = None
+) -> tuple[list[dict], str | None]:
+    """Get Users as UserOut payloads, plus the cursor of the next page"""
+    after_id = get_cursor_id(cursor) if cursor else None
+    user_rows = users_repository.get_users(db_session, skip, limit, after_id)
+
+    # ? Rows already have the UserOut fields, the API serializes them once with orjson
+    users = [user_row._asdict() for user_row in user_rows]
+    next_cursor = (
+        encode_cursor({"id": users[-1]["id"]})
+        if users and len(users) == limit
+        else None
+    )
 
-    return [UserOut.model_validate(user) for user in db_users]
+    return users, next_cursor
 
 
 def get_user_by_id(db_session: Session, user_id: int) -> UserOut:
@@ -30,6 +51,44 @@ def get_user_by_id(db_session: Session, user_id: int) -> UserOut:
     return UserOut.model_validate(db_user)
 
 
+def get_users_by_ids(db_session: Session, user_ids: list[int]) -> list[UserOut]:
+    """Get Users By Ids in user_ids order and a single query, users that don't exist
+    are left out"""
+    users = {
+        user_row.id: UserOut(**user_row._asdict())
+        for user_row in users_repository.get_users_by_ids(db_session, user_ids)
+    }
+
+    return [users[user_id] for user_id in user_ids if user_id in users]
+
+
+def user_etag(user_id: int, version: int) -> str:
+    """ETag of a UserOut"""
+    return make_etag(user_id, version)
+
+
+def users_etag(users: list[UserOut]) -> str:
+    """ETag of a list of UserOut"""
+    return hash_etag((user.id, user.version) for user in users)
+
+
+def get_user_by_id_if_none_match(
+    db_session: Session, user_id: int, if_none_match: str | None
+) -> tuple[UserOut | None, str]:
+    """Get User By Id and its ETag, no User when if_none_match matches it"""
+    if if_none_match:
+        # ? Version only: a 304 doesn't need the full row
+        version = users_repository.get_user_version(db_session, user_id)
+        if version is not None:
+            etag = user_etag(user_id, version)
+            if etag_matches(if_none_match, etag):
+                return None, etag
+
+    user = get_user_by_id(db_session, user_id)
+
+    return user, user_etag(user.id, user.version)
+
+
 def get_user_by_email(db_session: Session, user_email: str) -> UserOut:
     """Get User By Email"""
     db_user = users_repository.get_user_by_email(db_session, user_email)
@@ -48,13 +107,10 @@ def create_user(
     user: UserUpsert,
     # current_user: UserOut,
 ) -> UserOut:
-    """Create User"""
+    """Create User, user.password must already be hashed (hash_password_async)"""
     # TODO: if current_user.role == 'ADMIN'
     # if current_user:
-    # 1 hash the password
-    user.password = hash_password(user.password)
-
-    # 2 persist the user in the database
+    # ? the password is hashed by the route, in the bcrypt process pool
     db_user = UserModel(**user.model_dump())
     db_session.add(db_user)
     db_session.commit()
@@ -66,30 +122,36 @@ def create_user(
 # * PUT
 
 
+def check_own_user(db_session: Session, user_id: int, current_user: UserOut) -> None:
+    """Raises unless user_id is current_user's own account"""
+    if user_id != current_user.id:
+        # ? Nobody else's account can be touched, the query only picks 404 vs 403
+        if not users_repository.user_exists(db_session, user_id):
+            raise NotFoundException(f"User with id: {user_id} not found")
+        raise ForbiddenException("Not authorized to perform requested action")
+
+
 def update_user(
     db_session: Session,
     user_id: int,
     user_updated: UserUpsert,
     current_user: UserOut,
 ) -> UserOut:
-    """Update User"""
-    db_user = users_repository.get_user_by_id(db_session, user_id)
+    """Update User, user_updated.password must already be hashed (hash_password_async)"""
+    check_own_user(db_session, user_id, current_user)
 
-    if not db_user:
-        raise NotFoundException(f"User with id: {db_user} not found")
-    if db_user.id != current_user.id:
-        raise ForbiddenException("Not authorized to perform requested action")
+    user_row = users_repository.update_user(
+        db_session, user_id, user_updated.model_dump(exclude_unset=True)
+    )
 
-    for attr, value in user_updated.model_dump(exclude_unset=True).items():
-        if attr == "password":
-            setattr(db_user, attr, hash_password(value))
-            continue
-        setattr(db_user, attr, value)
+    if not user_row:
+        raise NotFoundException(f"User with id: {user_id} not found")
 
     db_session.commit()
-    db_session.refresh(db_user)
+    user_cache.delete(user_id)
+    invalidate_owner_posts(user_id)
 
-    return UserOut.model_validate(db_user)
+    return UserOut(**user_row._asdict())
 
 
 # * DELETE
@@ -101,14 +163,19 @@ def delete_user(
     current_user: UserOut,
 ) -> None:
     """Delete User"""
-    db_user = users_repository.get_user_by_id(db_session, user_id)
+    check_own_user(db_session, user_id, current_user)
 
-    if not db_user:
+    # ? Before the user row: its cascade would drop the votes without decrementing
+    voted_post_ids = votes_repository.delete_user_votes(db_session, user_id)
+    if not users_repository.delete_user(db_session, user_id):
         raise NotFoundException(f"User with id: {user_id} not found")
-    if db_user.id != current_user.id:
-        raise ForbiddenException("Not authorized to perform requested action")
 
-    db_session.delete(db_user)
     db_session.commit()
+    user_cache.delete(user_id)
+    # ? Their posts are gone too (ON DELETE CASCADE)
+    invalidate_owner_posts(user_id)
+    # ? And the posts they voted on lost a vote
+    for post_id in voted_post_ids:
+        invalidate_post(post_id)
 
     return None
@@ -1,14 +1,14 @@
 """ Votes Service """
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.repositories import votes_repository
+from app.services import posts_service
 from app.exceptions.http_exceptions import (
     ConflictException,
     NotFoundException,
 )
-from app.models.votes_model import VoteModel
 from app.schemas.votes_schemas import VotePayload, VoteOut
 from app.schemas.users_schemas import UserOut
-from app.services import posts_service
 
 
 def create_or_delete_vote(
@@ -17,30 +17,42 @@ def create_or_delete_vote(
     current_user: UserOut,
 ) -> VoteOut | None:
     """Create or Delete Vote"""
-    # ? Check if post associated to vote does exist
-    posts_service.get_post_by_id_with_n_votes(db_session, vote.post_id)
-
-    db_vote = votes_repository.get_vote(db_session, vote)
-
+    # ? Each direction is a single statement that also updates posts.vote_count
     if vote.dir == 1:
-        if db_vote:
+        try:
+            is_created = votes_repository.create_vote(
+                db_session, current_user.id, vote.post_id
+            )
+        except IntegrityError as exc_404:
+            # ? ON CONFLICT covers duplicates, so this is the votes -> posts foreign key
+            db_session.rollback()
+            raise NotFoundException(
+                f"Post with id: {vote.post_id} not found"
+            ) from exc_404
+
+        if not is_created:
+            db_session.rollback()
             raise ConflictException(
                 f"User with id: {current_user.id} has already voted on post with id: {vote.post_id}"
             )
-        else:
-            db_vote = VoteModel(user_id=current_user.id, post_id=vote.post_id)
-            db_session.add(db_vote)
-            db_session.commit()
-            db_session.refresh(db_vote)
 
-            return VoteOut.model_validate(db_vote)
+        db_session.commit()
+        # ? n_votes changed
+        posts_service.invalidate_post(vote.post_id)
+
+        return VoteOut(user_id=current_user.id, post_id=vote.post_id)
     # ? vote.dir == 0 means we want to delete a vote
     else:
-        if not db_vote:
+        is_deleted = votes_repository.delete_vote(
+            db_session, current_user.id, vote.post_id
+        )
+
+        if not is_deleted:
+            db_session.rollback()
             raise NotFoundException(
                 f"Vote with user_id: {current_user.id} and post_id: {vote.post_id} not found"
             )
-        else:
-            db_session.delete(db_vote)
-            db_session.commit()
-            return None
+
+        db_session.commit()
+        posts_service.invalidate_post(vote.post_id)
+        return None
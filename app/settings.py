@@ -1,4 +1,5 @@
 """ Enviroment Variables Utilities """
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,11 +12,62 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = "password"
     DB_HOSTNAME: str = "freecodecamp"
     DB_PORT: int = 5432
+    # ? Read replica used by the GET routes, None -> reads go to the primary too
+    DB_READ_HOSTNAME: str | None = None
+    DB_READ_PORT: int | None = None
+    # ? Users read from the primary for this long after their own writes
+    DB_READ_AFTER_WRITE_SECONDS: float = 5
     DB_NAME: str = "fastapi"
     DB_TEST_NAME: str = "fastapi_test"
+    DB_ASYNC_ENABLED: bool = True
+    DB_THREADPOOL_SIZE: int = 20
+    # ? Per engine and per worker process, None -> DB_THREADPOOL_SIZE: every db thread
+    # ? can hold a connection
+    DB_POOL_SIZE: int | None = None
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # ? Connections opened per engine at startup, so the first requests don't pay for them
+    DB_POOL_WARMUP_CONNECTIONS: int = 5
+    STARTUP_WARMUP_ENABLED: bool = True
+    # ? Statements slower than this are logged, None disables the slow query log
+    DB_SLOW_QUERY_SECONDS: float | None = 0.2
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # ? None -> one worker per core; each one has its own DB pools, size them accordingly
+    SERVER_WORKERS: int | None = None
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_TIMEOUT: int = 60
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_LIMIT_CONCURRENCY: int | None = None
+    # ? Recycle workers after this many requests, 0 disables it
+    SERVER_MAX_REQUESTS: int = 0
+    SERVER_PRELOAD: bool = True
     SECRET_KEY: str = "SecretKey123"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 21
+    PASSWORD_POOL_SIZE: int = 2
+    PASSWORD_POOL_MAX_PENDING: int = 64
+    METRICS_ENABLED: bool = True
+    # ? Shared dir (e.g. a tmpfs) where each worker process dumps its metrics
+    METRICS_MULTIPROC_DIR: str | None = None
+    METRICS_FLUSH_SECONDS: float = 1
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60
+    POST_CACHE_MAX_SIZE: int = 10_000
+    POST_CACHE_TTL_SECONDS: float = 10
+    # ? memory: per worker, shared_memory: per host, redis: shared by every host
+    CACHE_BACKEND: Literal["memory", "shared_memory", "redis"] = "memory"
+    # ? Prefix of the shared memory segments and of the Redis keys
+    CACHE_NAMESPACE: str = "fastapi_cache"
+    # ? Bytes per cached entry, larger values (e.g. long posts) are not cached
+    CACHE_SHM_SLOT_SIZE: int = 1024
+    CACHE_SHM_LOCK_DIR: str | None = None
+    # ? redis://[[username]:password@]host:port/db, credentials are sent with AUTH
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_REDIS_TIMEOUT_SECONDS: float = 0.1
 
 
 settings = Settings()
@@ -0,0 +1,121 @@
+""" Startup Warm-Up """
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable
+from app.database import db_config
+from app.database.db_config import (
+    AsyncEngine,
+    AsyncReadEngine,
+    AsyncReadSessionLocal,
+    Engine,
+    ReadEngine,
+    ReadSessionLocal,
+    run_in_session,
+)
+from app.exceptions.http_exceptions import NotFoundException
+from app.monitoring.metrics_registry import Family, metrics
+from app.services import posts_service
+from app.settings import settings
+from app.utils.password_utils import hash_password_async
+
+# ? Phase -> seconds, e.g. {"imports": 1.9, "db_pool": 0.04, "password_pool": 0.8}
+startup_timings: dict[str, float] = {}
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Stores how long a startup phase took and prints it"""
+    startup_timings[phase] = seconds
+    print(f"[{os.getpid()}] startup {phase}: {seconds * 1000:.1f} ms")
+
+
+async def warm_db_pool() -> None:
+    """Opens DB_POOL_WARMUP_CONNECTIONS connections per engine in use, then pools them"""
+    n_connections = min(
+        settings.DB_POOL_WARMUP_CONNECTIONS, db_config.POOL_OPTIONS["pool_size"]
+    )
+
+    if settings.DB_ASYNC_ENABLED:
+        for async_engine in {AsyncEngine, AsyncReadEngine}:
+            # ? Held all at once, otherwise the pool just hands the same one back
+            connections = await asyncio.gather(
+                *(async_engine.connect() for _ in range(n_connections))
+            )
+            for connection in connections:
+                await connection.close()
+        return
+
+    def open_connections() -> None:
+        for engine in {Engine, ReadEngine}:
+            connections = [engine.connect() for _ in range(n_connections)]
+            for connection in connections:
+                connection.close()
+
+    await asyncio.to_thread(open_connections)
+
+
+async def warm_password_pool() -> None:
+    """Spawns every bcrypt process and loads the bcrypt backend in each one"""
+    await asyncio.gather(
+        *(hash_password_async("warm-up") for _ in range(settings.PASSWORD_POOL_SIZE))
+    )
+
+
+async def warm_post_cache() -> None:
+    """Loads the latest post, the hottest read, into posts_service.post_cache"""
+    try:
+        if settings.DB_ASYNC_ENABLED:
+            async with AsyncReadSessionLocal() as db_session:
+                await run_in_session(
+                    db_session, posts_service.get_latest_post_with_n_votes
+                )
+            return
+
+        def load_latest_post() -> None:
+            with ReadSessionLocal() as db_session:
+                posts_service.get_latest_post_with_n_votes(db_session)
+
+        await asyncio.to_thread(load_latest_post)
+    except NotFoundException:
+        # ? No posts yet, nothing to warm
+        pass
+
+
+WARMUP_STEPS: dict[str, Callable[[], Awaitable[None]]] = {
+    "db_pool": warm_db_pool,
+    "password_pool": warm_password_pool,
+    "post_cache": warm_post_cache,
+}
+
+
+async def warm_up() -> None:
+    """Runs every warm-up step, a failing one (e.g. DB not up yet) doesn't stop the boot"""
+    started = time.perf_counter()
+
+    for phase, step in WARMUP_STEPS.items():
+        step_started = time.perf_counter()
+        try:
+            await step()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            print(f"[{os.getpid()}] startup {phase} failed: {exc!r}")
+            continue
+        record_phase(phase, time.perf_counter() - step_started)
+
+    record_phase("warm_up", time.perf_counter() - started)
+
+
+def startup_collector() -> dict[str, Family]:
+    """Exposes the startup phase timings of this process"""
+    return {
+        "app_startup_seconds": {
+            "type": "gauge",
+            "help": "Duration of each startup phase (imports, warm-up steps)",
+            "samples": {
+                f'app_startup_seconds{{phase="{phase}"}}': seconds
+                for phase, seconds in startup_timings.items()
+            },
+        }
+    }
+
+
+metrics.register_collector(startup_collector)
@@ -0,0 +1,90 @@
+""" In-Process Cache Utils """
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+from app.cache.base import CacheBackend
+
+
+class TTLCache(CacheBackend):
+    """Thread safe LRU cache whose entries also expire after ttl_seconds"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # ? Bumped by every invalidation, see set(version=...)
+        self._version = 0
+        # ? Sync routes run in a thread pool -> entries can be touched concurrently
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        """Returns the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Like get, without touching the LRU order nor the hit/miss counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None or entry[0] < time.monotonic() else entry[1]
+
+    @property
+    def version(self) -> int:
+        """Read it before loading a value, then pass it to set"""
+        return self._version
+
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        """Caches value, evicting the least recently used entry when full"""
+        with self._lock:
+            # ? Invalidated since version was read -> value may predate a write, drop it
+            if version is not None and version != self._version:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Invalidates a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._version += 1
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Invalidates every entry whose value matches predicate, O(size)"""
+        with self._lock:
+            for key in [
+                key for key, (_, value) in self._entries.items() if predicate(value)
+            ]:
+                del self._entries[key]
+            self._version += 1
+
+    def clear(self) -> None:
+        """Invalidates every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+
+    def stats(self) -> dict[str, int]:
+        """Returns hit/miss counters and current size, for monitoring"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,47 @@
+""" Pagination Cursor Utils """
+import base64
+import binascii
+import orjson
+from app.exceptions.http_exceptions import BadRequestException
+
+# ? Response header carrying the cursor of the next page of a list endpoint
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_key: dict) -> str:
+    """Returns an opaque cursor pointing right after the given sort key"""
+    return base64.urlsafe_b64encode(orjson.dumps(sort_key)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Returns the sort key encoded in a cursor made by encode_cursor"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        sort_key = orjson.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError) as exc_400:
+        raise BadRequestException("Invalid cursor") from exc_400
+
+    if not isinstance(sort_key, dict):
+        raise BadRequestException("Invalid cursor")
+
+    return sort_key
+
+
+def get_cursor_id(cursor: str) -> int:
+    """Returns the last seen id encoded in an id ordered cursor"""
+    last_id = decode_cursor(cursor).get("id")
+
+    if not isinstance(last_id, int):
+        raise BadRequestException("Invalid cursor")
+
+    return last_id
+
+
+def get_cursor_rank(cursor: str) -> float:
+    """Returns the last seen search rank encoded in a rank ordered cursor"""
+    last_rank = decode_cursor(cursor).get("rank")
+
+    if not isinstance(last_rank, (int, float)) or isinstance(last_rank, bool):
+        raise BadRequestException("Invalid cursor")
+
+    return float(last_rank)
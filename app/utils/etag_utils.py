@@ -0,0 +1,39 @@
+""" ETag Utils """
+import hashlib
+from typing import Iterable
+from fastapi import Response, status
+
+ETAG_HEADER = "ETag"
+
+
+def make_etag(*parts: int | str) -> str:
+    """Strong ETag of a single resource, from what identifies its representation"""
+    return '"' + ".".join(str(part) for part in parts) + '"'
+
+
+def hash_etag(items: Iterable[tuple]) -> str:
+    """Strong ETag of a list of resources, from each one's identifying parts"""
+    digest = hashlib.blake2b(digest_size=16)
+    for item in items:
+        digest.update(repr(item).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified_response(etag: str) -> Response:
+    """304 with no body, the client reuses the representation it already has"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={ETAG_HEADER: etag}
+    )
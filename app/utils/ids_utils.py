@@ -0,0 +1,18 @@
+""" Ids Utils """
+from app.exceptions.http_exceptions import BadRequestException
+
+# ? Upper bound of ?ids= lookups, same as the default page size
+MAX_IDS_PER_REQUEST = 100
+
+
+def parse_ids(ids: str, max_ids: int) -> list[int]:
+    """Parses a comma separated ids query param, duplicates dropped, order kept"""
+    try:
+        parsed_ids = list(dict.fromkeys(int(id_) for id_ in ids.split(",") if id_))
+    except ValueError as exc_400:
+        raise BadRequestException("ids must be comma separated integers") from exc_400
+
+    if not parsed_ids or len(parsed_ids) > max_ids:
+        raise BadRequestException(f"Pass between 1 and {max_ids} ids")
+
+    return parsed_ids
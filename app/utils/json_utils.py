@@ -0,0 +1,24 @@
+""" JSON Utils """
+from datetime import datetime
+from typing import Any
+import orjson
+from fastapi import Response
+
+
+def dumps(content: Any) -> bytes:
+    """Serializes plain python data to JSON bytes, datetimes in UTC end with Z"""
+    # ? OPT_UTC_Z -> the very format pydantic gives response_model routes: a post
+    # ? reads the same from /posts and /posts/{id}
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def isoformat(value: datetime) -> str:
+    """value as dumps writes it, for text formats other than JSON (CSV)"""
+    return dumps(value)[1:-1].decode()
+
+
+def json_response(content: Any, headers: dict[str, str] | None = None) -> Response:
+    """Returns an already encoded JSON response, FastAPI won't validate it again"""
+    return Response(
+        content=dumps(content), media_type="application/json", headers=headers
+    )
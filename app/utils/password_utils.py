@@ -1,14 +1,106 @@
 """ Hashing Utils """
-from passlib.context import CryptContext
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from typing import TYPE_CHECKING, Callable, TypeVar
+from app.settings import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+# ? bcrypt is pure CPU under the GIL -> it runs in its own processes, created lazily
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pool_stats = {"pending": 0, "completed": 0, "rejected": 0}
+
+
+@cache
+def get_pwd_context() -> "CryptContext":
+    """Returns the passlib context, imported on first use"""
+    # ? Only the bcrypt pool processes hash, web workers never pay for importing passlib
+    # pylint: disable=import-outside-toplevel
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str) -> str:
     """Returns an hashed password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies if a plain password is equal to an hashed one"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def get_password_pool() -> ProcessPoolExecutor:
+    """Returns the bcrypt process pool, starting it on first use"""
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is None:
+            # ? spawn -> children don't inherit the parent's threads and sockets
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_password_pool() -> None:
+    """Stops the bcrypt worker processes, if they were started"""
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def password_pool_stats() -> dict[str, int]:
+    """Returns queue depth and throughput counters of the bcrypt pool"""
+    with _pool_lock:
+        pending = _pool_stats["pending"]
+        return {
+            "workers": settings.PASSWORD_POOL_SIZE,
+            "in_flight": min(pending, settings.PASSWORD_POOL_SIZE),
+            "queued": max(pending - settings.PASSWORD_POOL_SIZE, 0),
+            "completed": _pool_stats["completed"],
+            "rejected": _pool_stats["rejected"],
+        }
+
+
+async def _run_in_password_pool(func: Callable[..., T], *args) -> T:
+    # ? Imported here: the spawned bcrypt processes import this module too,
+    # ? and shouldn't pay for importing FastAPI just to hash
+    # pylint: disable=import-outside-toplevel
+    from app.exceptions.http_exceptions import ServiceUnavailableException
+
+    with _pool_lock:
+        # ? Past the cap, shed load instead of queueing logins for seconds
+        if _pool_stats["pending"] >= settings.PASSWORD_POOL_MAX_PENDING:
+            _pool_stats["rejected"] += 1
+            raise ServiceUnavailableException("Too many pending password checks")
+        _pool_stats["pending"] += 1
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            get_password_pool(), func, *args
+        )
+    finally:
+        with _pool_lock:
+            _pool_stats["pending"] -= 1
+            _pool_stats["completed"] += 1
+
+
+async def hash_password_async(password: str) -> str:
+    """Returns an hashed password, computed in the bcrypt process pool"""
+    return await _run_in_password_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a plain password against an hashed one in the bcrypt process pool"""
+    return await _run_in_password_pool(verify_password, plain_password, hashed_password)
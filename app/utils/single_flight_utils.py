@@ -0,0 +1,54 @@
+""" Single Flight Utils """
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+from app.monitoring.metrics_registry import metrics
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_CALLS = "single_flight_calls_total"
+SINGLE_FLIGHT_COALESCED = "single_flight_coalesced_total"
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight call and its result
+
+    Nothing is kept once the call completes: it dedupes a burst of identical reads,
+    caching them is post_cache's job.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        """Calls currently running"""
+        return len(self._flights)
+
+    def _land(self, key: Hashable, flight: asyncio.Task) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Awaits func(), or the call already running for key"""
+        flight = self._flights.get(key)
+
+        if flight is None:
+            # ? A task, not the caller's own coroutine: if the first caller is
+            # ? cancelled (client gone) the others still get the result
+            flight = asyncio.ensure_future(func())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._land(key, flight))
+            metrics.inc(
+                SINGLE_FLIGHT_CALLS,
+                "Calls that actually ran, one per burst of identical calls",
+                {"flight": self.name},
+            )
+        else:
+            metrics.inc(
+                SINGLE_FLIGHT_COALESCED,
+                "Calls that joined an identical call already in flight",
+                {"flight": self.name},
+            )
+
+        # ? shield -> cancelling one caller doesn't cancel the shared call
+        return await asyncio.shield(flight)
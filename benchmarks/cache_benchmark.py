@@ -0,0 +1,146 @@
+""" Cache Backend Benchmark
+
+Compares, for a typical PostOut (owner included):
+    - the binary codec with JSON and pickle: encoded size, encode/decode time
+    - the memory, shared_memory and redis backends: get/set time per call
+
+The redis backend runs against benchmarks.resp_stand_in unless --redis-url points
+to a real server. No database needed:
+
+    python -m benchmarks.cache_benchmark
+    python -m benchmarks.cache_benchmark --redis-url redis://localhost:6379/0
+"""
+import argparse
+import json
+import pickle
+import threading
+import timeit
+from datetime import datetime, timezone
+from app.cache.base import CacheBackend
+from app.cache.codecs import PostCodec
+from app.cache.redis_backend import RedisCache
+from app.cache.resp_client import RespClient
+from app.cache.shared_memory_backend import SharedMemoryCache
+from app.schemas.posts_schemas import PostOut
+from app.schemas.users_schemas import UserOut
+from app.utils.cache_utils import TTLCache
+from benchmarks.resp_stand_in import RespServer
+
+N_KEYS = 1000
+
+
+def make_post(post_id: int) -> PostOut:
+    created_at = datetime.now(timezone.utc)
+    owner = UserOut(
+        email=f"user{post_id}@email.com",
+        password="$2b$12$" + "x" * 53,
+        id=post_id,
+        created_at=created_at,
+    )
+    return PostOut(
+        title=f"title {post_id}",
+        content="content " * 20,
+        published=True,
+        rating=post_id % 5,
+        id=post_id,
+        created_at=created_at,
+        owner=owner,
+        n_votes=post_id,
+    )
+
+
+def best_us(func, repeat: int, number: int) -> float:
+    """Best of repeat runs, in µs per call"""
+    return round(
+        min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6, 3
+    )
+
+
+def run_codecs(post: PostOut, repeat: int = 5, number: int = 10_000) -> list[dict]:
+    codecs = {
+        "binary": (PostCodec().encode, PostCodec().decode),
+        "json": (
+            lambda value: value.model_dump_json().encode(),
+            PostOut.model_validate_json,
+        ),
+        "pickle": (pickle.dumps, pickle.loads),
+    }
+
+    results = []
+    for name, (encode, decode) in codecs.items():
+        data = encode(post)
+        assert decode(data) == post
+        results.append(
+            {
+                "codec": name,
+                "bytes": len(data),
+                "encode_us": best_us(lambda: encode(post), repeat, number),
+                "decode_us": best_us(lambda: decode(data), repeat, number),
+            }
+        )
+    return results
+
+
+def run_backend(
+    name: str, backend: CacheBackend, repeat: int = 5, number: int = 2000
+) -> dict:
+    posts = [make_post(post_id) for post_id in range(N_KEYS)]
+    for post in posts:
+        backend.set(post.id, post)
+    assert backend.get(0) == posts[0]
+
+    keys = iter(range(10**9))
+    return {
+        "backend": name,
+        "get_hit_us": best_us(lambda: backend.get(next(keys) % N_KEYS), repeat, number),
+        "get_miss_us": best_us(lambda: backend.get(-1), repeat, number),
+        "set_us": best_us(
+            lambda: backend.set(next(keys) % N_KEYS, posts[0]), repeat, number
+        ),
+        "set_versioned_us": best_us(
+            lambda: backend.set(0, posts[0], backend.version), repeat, number
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--redis-url", help="Real server instead of the stand-in")
+    args = parser.parse_args()
+
+    stand_in = None
+    if not args.redis_url:
+        stand_in = RespServer()
+        threading.Thread(target=stand_in.serve_forever, daemon=True).start()
+
+    codec = PostCodec()
+    shared = SharedMemoryCache("cache_benchmark_post", 2 * N_KEYS, 60, codec)
+    redis = RedisCache(
+        "post",
+        60,
+        codec,
+        RespClient.from_url(args.redis_url or stand_in.url, timeout=1),
+        namespace="cache_benchmark",
+    )
+    try:
+        report = {
+            "codecs": run_codecs(make_post(1)),
+            "backends": [
+                run_backend("memory", TTLCache(2 * N_KEYS, 60)),
+                run_backend("shared_memory", shared),
+                run_backend("redis", redis),
+            ],
+        }
+    finally:
+        redis.clear()
+        redis.close()
+        shared.close()
+        shared.unlink()
+        if stand_in:
+            stand_in.shutdown()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
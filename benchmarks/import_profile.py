@@ -0,0 +1,92 @@
+""" Import Time Profile
+
+Imports app.main in a fresh interpreter with -X importtime and reports the
+slowest modules (cumulative, i.e. including what they import) and the self time
+spent per top level package, to spot what is worth importing lazily:
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --module app.server --top 40 --json
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_imports(module: str) -> list[dict]:
+    """Returns every module imported by module with its self/cumulative time (ms)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append(
+                {
+                    "module": name,
+                    "depth": len(indent) // 2,
+                    "self_ms": int(self_us) / 1000,
+                    "cumulative_ms": int(cumulative_us) / 1000,
+                }
+            )
+
+    return imports
+
+
+def self_time_per_package(imports: list[dict]) -> dict[str, float]:
+    """Sums self times per top level package (fastapi, sqlalchemy, app...)"""
+    packages: dict[str, float] = {}
+    for imported in imports:
+        package = imported["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + imported["self_ms"]
+
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", action="store_true", help="Print a JSON report")
+    args = parser.parse_args()
+
+    imports = profile_imports(args.module)
+    # ? The last line is the profiled module itself, whose cumulative time is the total
+    total_ms = imports[-1]["cumulative_ms"] if imports else 0.0
+    slowest = sorted(imports, key=lambda item: item["cumulative_ms"], reverse=True)
+    packages = self_time_per_package(imports)
+
+    if args.json:
+        report = {
+            "module": args.module,
+            "total_ms": total_ms,
+            "slowest_modules": slowest[: args.top],
+            "self_ms_per_package": packages,
+        }
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import {args.module}: {total_ms:.1f} ms, {len(imports)} modules\n")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for imported in slowest[: args.top]:
+        print(
+            f"{imported['cumulative_ms']:>14.1f}{imported['self_ms']:>10.1f}  "
+            f"{imported['module']}"
+        )
+
+    print(f"\n{'self ms':>14}  package")
+    for package, self_ms in list(packages.items())[: args.top]:
+        print(f"{self_ms:>14.1f}  {package}")
+
+
+if __name__ == "__main__":
+    main()
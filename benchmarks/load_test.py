@@ -0,0 +1,463 @@
+""" Load Test
+
+Seeds a local Postgres (the one configured in .env) with users, posts and votes,
+then hammers a running API with scripted scenarios and reports throughput and
+p50/p95/p99 latency per scenario as JSON:
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.load_test --output before.json
+    # ...change something, restart the API...
+    python -m benchmarks.load_test --skip-seed --output after.json --compare before.json
+
+Seeded users have a @loadtest.local email, --reset deletes them and, through the
+ON DELETE CASCADE foreign keys, their posts and votes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+import httpx
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.database.db_config import Engine
+from app.models.posts_model import PostModel
+from app.models.users_model import UserModel
+from app.models.votes_model import VoteModel
+from app.utils.password_utils import hash_password
+
+SEED_EMAIL_DOMAIN = "loadtest.local"
+SEED_PASSWORD = "LoadTest123"
+SEED_BATCH_SIZE = 5_000
+TITLE_WORDS = (
+    "fastapi python postgres async index cache query latency pool worker "
+    "vote post user feed cursor trigram replica metrics release deploy"
+).split()
+
+# 5 SEED
+
+
+def seed(n_users: int, n_posts: int, n_votes: int, rng: random.Random) -> None:
+    """Bulk inserts the load test users, posts and votes straight into the DB"""
+    # ? One bcrypt hash for everybody, hashing n_users passwords would take minutes
+    password_hash = hash_password(SEED_PASSWORD)
+
+    with Engine.begin() as connection:
+        user_ids = connection.scalars(
+            insert(UserModel).returning(UserModel.id),
+            [
+                {"email": f"user{i}@{SEED_EMAIL_DOMAIN}", "password": password_hash}
+                for i in range(n_users)
+            ],
+        ).all()
+
+        post_ids = []
+        for start in range(0, n_posts, SEED_BATCH_SIZE):
+            post_ids += connection.scalars(
+                insert(PostModel).returning(PostModel.id),
+                [
+                    {
+                        "title": f"load test post {i} {rng.choice(TITLE_WORDS)}",
+                        "content": " ".join(rng.choices(TITLE_WORDS, k=40)),
+                        "published": rng.random() < 0.8,
+                        "rating": rng.randint(0, 5),
+                        "owner_id": rng.choice(user_ids),
+                    }
+                    for i in range(start, min(start + SEED_BATCH_SIZE, n_posts))
+                ],
+            ).all()
+
+        # ? Popular posts get most of the votes, like real feeds
+        vote_pairs = {
+            (rng.choice(user_ids), post_ids[int(rng.paretovariate(1.2)) % n_posts])
+            for _ in range(n_votes)
+        }
+        votes = [
+            {"user_id": user_id, "post_id": post_id} for user_id, post_id in vote_pairs
+        ]
+        for start in range(0, len(votes), SEED_BATCH_SIZE):
+            connection.execute(
+                pg_insert(VoteModel).on_conflict_do_nothing(),
+                votes[start : start + SEED_BATCH_SIZE],
+            )
+
+        # ? Votes were inserted behind the denormalized counter's back
+        connection.execute(
+            update(PostModel)
+            .where(PostModel.id.in_(post_ids))
+            .values(
+                vote_count=select(func.count())
+                .where(VoteModel.post_id == PostModel.id)
+                .scalar_subquery()
+            )
+        )
+
+
+def reset() -> None:
+    """Deletes every load test user, their posts and votes cascade"""
+    with Engine.begin() as connection:
+        connection.execute(
+            delete(UserModel).where(UserModel.email.endswith(f"@{SEED_EMAIL_DOMAIN}"))
+        )
+
+
+def load_seeded_ids() -> tuple[list[str], list[int]]:
+    """Returns the seeded users emails and the seeded posts ids"""
+    with Engine.connect() as connection:
+        emails = connection.scalars(
+            select(UserModel.email)
+            .where(UserModel.email.endswith(f"@{SEED_EMAIL_DOMAIN}"))
+            .order_by(UserModel.id)
+        ).all()
+        post_ids = connection.scalars(
+            select(PostModel.id)
+            .join(UserModel, PostModel.owner_id == UserModel.id)
+            .where(UserModel.email.endswith(f"@{SEED_EMAIL_DOMAIN}"))
+            .order_by(PostModel.id)
+        ).all()
+
+    return emails, post_ids
+
+
+# 5 SCENARIOS
+
+
+@dataclass
+class VirtualUser:
+    """One concurrent client, logged in as one of the seeded users"""
+
+    email: str
+    client: httpx.AsyncClient
+    rng: random.Random
+    post_ids: list[int]
+    headers: dict[str, str] = field(default_factory=dict)
+    own_post_ids: list[int] = field(default_factory=list)
+    voted_post_ids: set[int] = field(default_factory=set)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a request as this user, through the shared connection pool"""
+        return await self.client.request(method, url, headers=self.headers, **kwargs)
+
+    async def login(self) -> httpx.Response:
+        return await self.client.post(
+            "/login", data={"username": self.email, "password": SEED_PASSWORD}
+        )
+
+    async def authenticate(self) -> None:
+        res = await self.login()
+        res.raise_for_status()
+        self.headers["Authorization"] = f"Bearer {res.json()['access_token']}"
+
+    async def create_own_post(self) -> None:
+        """Gives this user a post of its own to update or delete"""
+        res = await self.request(
+            "POST", "/posts", json={"title": "load test post", "content": "created"}
+        )
+        res.raise_for_status()
+        self.own_post_ids.append(res.json()["id"])
+
+
+Scenario = Callable[[VirtualUser], Awaitable[httpx.Response]]
+ScenarioSetup = Callable[[VirtualUser], Awaitable[None]]
+
+
+async def login(user: VirtualUser) -> httpx.Response:
+    return await user.login()
+
+
+async def list_posts(user: VirtualUser) -> httpx.Response:
+    # ? Mostly first pages, sometimes a search
+    if user.rng.random() < 0.2:
+        return await user.request(
+            "GET",
+            "/posts",
+            params={"search": user.rng.choice(TITLE_WORDS), "limit": 20},
+        )
+    return await user.request("GET", "/posts", params={"limit": 20})
+
+
+async def get_post(user: VirtualUser) -> httpx.Response:
+    return await user.request("GET", f"/posts/{user.rng.choice(user.post_ids)}")
+
+
+async def get_latest_post(user: VirtualUser) -> httpx.Response:
+    return await user.request("GET", "/posts/latest")
+
+
+async def vote_toggle(user: VirtualUser) -> httpx.Response:
+    # ? Hot posts, the ones seed() gave most votes to
+    post_id = user.rng.choice(user.post_ids[:100])
+    direction = 0 if post_id in user.voted_post_ids else 1
+    res = await user.request(
+        "POST", "/votes", json={"post_id": post_id, "dir": direction}
+    )
+
+    # ? 409/404 -> a seeded vote we didn't know about, just flip our local state
+    user.voted_post_ids ^= {post_id}
+    return res
+
+
+async def create_post(user: VirtualUser) -> httpx.Response:
+    res = await user.request(
+        "POST",
+        "/posts",
+        json={"title": "load test post", "content": "created", "published": True},
+    )
+    if res.status_code == 201:
+        user.own_post_ids.append(res.json()["id"])
+    return res
+
+
+async def ensure_own_post(user: VirtualUser) -> None:
+    if not user.own_post_ids:
+        await user.create_own_post()
+
+
+async def update_post(user: VirtualUser) -> httpx.Response:
+    return await user.request(
+        "PUT",
+        f"/posts/{user.rng.choice(user.own_post_ids)}",
+        json={"title": "updated load test post", "content": "updated"},
+    )
+
+
+async def delete_post(user: VirtualUser) -> httpx.Response:
+    return await user.request("DELETE", f"/posts/{user.own_post_ids.pop()}")
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "login": login,
+    "list_posts": list_posts,
+    "get_post": get_post,
+    "get_latest_post": get_latest_post,
+    "vote_toggle": vote_toggle,
+    "create_post": create_post,
+    "update_post": update_post,
+    "delete_post": delete_post,
+}
+# ? Run before each request of their scenario, outside of its timing
+SCENARIO_SETUPS: dict[str, ScenarioSetup] = {
+    "update_post": ensure_own_post,
+    "delete_post": ensure_own_post,
+}
+
+# 5 RUN
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(
+    latencies: list[float],
+    statuses: dict,
+    errors: int,
+    elapsed: float,
+    setup_errors: dict | None = None,
+):
+    """Throughput and latency percentiles (ms) of a single scenario run"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "setup_errors": dict(sorted((setup_errors or {}).items())),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2)
+        if latencies
+        else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run_scenario(
+    scenario: Scenario,
+    users: list[VirtualUser],
+    duration: float,
+    warmup: float,
+    setup: ScenarioSetup | None = None,
+) -> dict:
+    """Runs scenario in a closed loop on every virtual user for duration seconds,
+    timing its request only: setup runs before the clock starts"""
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    errors = 0
+    # ? Failed setups, by exception: the scenario request never ran, so they are
+    # ? neither a latency nor an error of the scenario
+    setup_errors: dict[str, int] = {}
+
+    async def user_loop(user: VirtualUser, until: float, record: bool) -> None:
+        nonlocal errors
+        while time.perf_counter() < until:
+            if setup is not None:
+                try:
+                    await setup(user)
+                except httpx.HTTPError as exc:
+                    if record:
+                        error_name = type(exc).__name__
+                        setup_errors[error_name] = setup_errors.get(error_name, 0) + 1
+                    continue
+
+            start = time.perf_counter()
+            try:
+                res = await scenario(user)
+                status_code = str(res.status_code)
+                is_error = res.status_code >= 500
+            except httpx.HTTPError as exc:
+                status_code, is_error = type(exc).__name__, True
+            if not record:
+                continue
+
+            latencies.append(time.perf_counter() - start)
+            statuses[status_code] = statuses.get(status_code, 0) + 1
+            errors += is_error
+
+    if warmup:
+        until = time.perf_counter() + warmup
+        await asyncio.gather(*(user_loop(user, until, False) for user in users))
+
+    start = time.perf_counter()
+    until = start + duration
+    await asyncio.gather(*(user_loop(user, until, True) for user in users))
+
+    return summarize(
+        latencies, statuses, errors, time.perf_counter() - start, setup_errors
+    )
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Logs every virtual user in, then runs the selected scenarios one at a time"""
+    emails, post_ids = load_seeded_ids()
+    if not emails or not post_ids:
+        raise SystemExit("Nothing seeded, run without --skip-seed first")
+
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    results = {}
+
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        users = [
+            VirtualUser(
+                email=emails[i % len(emails)],
+                client=client,
+                rng=random.Random(rng.random()),
+                post_ids=post_ids,
+            )
+            for i in range(args.concurrency)
+        ]
+        await asyncio.gather(*(user.authenticate() for user in users))
+
+        for name in args.scenarios:
+            results[name] = await run_scenario(
+                SCENARIOS[name],
+                users,
+                args.duration,
+                args.warmup,
+                SCENARIO_SETUPS.get(name),
+            )
+            print(f"{name}: {json.dumps(results[name])}", flush=True)
+
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "seeded_users": len(emails),
+            "seeded_posts": len(post_ids),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """Prints the relative change of each metric against a previous report"""
+    print(f"\n{'scenario':<16}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+
+        changes = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (
+                (result[key] - before[key]) / before[key] * 100 if before[key] else 0
+            )
+            changes.append(f"{change:+.1f}%")
+        print(f"{name:<16}" + "".join(f"{change:>10}" for change in changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=50_000)
+    parser.add_argument("--votes", type=int, default=200_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15, help="Seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--reset", action="store_true", help="Delete the seeded data")
+    parser.add_argument("--output", help="JSON report path, stdout if omitted")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    if args.reset:
+        reset()
+        return
+
+    if not args.skip_seed:
+        reset()
+        seed(args.users, args.posts, args.votes, random.Random(args.seed))
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            compare(report, json.load(baseline_file))
+
+
+if __name__ == "__main__":
+    main()
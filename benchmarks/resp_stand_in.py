@@ -0,0 +1,209 @@
+""" Redis Protocol Stand-In Server
+
+In-memory server speaking just enough RESP2 for app.cache.redis_backend, so the
+redis cache can be tested and benchmarked without a Redis install:
+
+    python -m benchmarks.resp_stand_in --port 6380
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://localhost:6380/0 python -m app.server
+"""
+import argparse
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+from typing import Any
+
+
+class Store:
+    """Keys with an optional expiry, guarded by a single lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values: dict[bytes, tuple[bytes, float | None]] = {}
+        # ? Bumped on every write of a key, what WATCH compares
+        self.revisions: dict[bytes, int] = {}
+
+    def get(self, key: bytes) -> bytes | None:
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] < time.monotonic():
+            self.delete(key)
+            return None
+        return entry[0]
+
+    def set(self, key: bytes, value: bytes, expires_at: float | None = None) -> None:
+        self.values[key] = (value, expires_at)
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+
+    def delete(self, key: bytes) -> bool:
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+        return self.values.pop(key, None) is not None
+
+
+def encode_reply(reply: Any) -> bytes:
+    """Encodes a reply: str -> status, Exception -> error, int, bytes, None, list"""
+    if isinstance(reply, Exception):
+        return b"-ERR %b\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%b\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%b\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode_reply(item) for item in reply)
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """One thread per connection, reads commands and writes replies in order"""
+
+    store: Store
+    password: str | None
+
+    def setup(self):
+        super().setup()
+        self.authenticated = self.password is None
+        # ? Pipelined replies are written one by one, don't let Nagle hold them back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.watched: dict[bytes, int] = {}
+        self.queued: list[list[bytes]] | None = None
+
+    def read_command(self) -> list[bytes] | None:
+        """Reads a RESP array of bulk strings, None once the client is gone"""
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while (command := self.read_command()) is not None:
+            self.wfile.write(encode_reply(self.dispatch(command)))
+
+    def dispatch(self, command: list[bytes]) -> Any:
+        """Runs command, or queues it inside MULTI"""
+        name = command[0].upper().decode()
+        if name == "AUTH":
+            # ? AUTH password or AUTH user password, any user name goes
+            self.authenticated = command[-1].decode() == self.password
+            return "OK" if self.authenticated else ValueError("invalid password")
+        if not self.authenticated:
+            return ValueError("NOAUTH Authentication required")
+        if self.queued is not None and name not in ("EXEC", "MULTI"):
+            self.queued.append(command)
+            return "QUEUED"
+
+        with self.store.lock:
+            if name == "WATCH":
+                for key in command[1:]:
+                    self.watched[key] = self.store.revisions.get(key, 0)
+                return "OK"
+            if name == "UNWATCH":
+                self.watched.clear()
+                return "OK"
+            if name == "MULTI":
+                self.queued = []
+                return "OK"
+            if name == "EXEC":
+                queued, self.queued = self.queued or [], None
+                watched, self.watched = self.watched, {}
+                if any(
+                    self.store.revisions.get(key, 0) != revision
+                    for key, revision in watched.items()
+                ):
+                    return None
+                return [self.run(command) for command in queued]
+            return self.run(command)
+
+    def run(self, command: list[bytes]) -> Any:
+        """Runs a data command, the store lock is held"""
+        # pylint: disable=too-many-return-statements
+        name, args = command[0].upper().decode(), command[1:]
+        store = self.store
+        try:
+            if name == "PING":
+                return "PONG"
+            if name == "SELECT":
+                return "OK"
+            if name == "GET":
+                return store.get(args[0])
+            if name == "MGET":
+                return [store.get(key) for key in args]
+            if name == "SET":
+                expires_at = None
+                if len(args) == 4:
+                    unit = 1 if args[2].upper() == b"EX" else 0.001
+                    expires_at = time.monotonic() + int(args[3]) * unit
+                store.set(args[0], args[1], expires_at)
+                return "OK"
+            if name == "DEL":
+                return sum(store.delete(key) for key in args)
+            if name == "INCR":
+                value = int(store.get(args[0]) or 0) + 1
+                store.set(args[0], str(value).encode())
+                return value
+            if name == "SCAN":
+                # ? Single pass: every matching key and cursor 0 at once
+                pattern = args[args.index(b"MATCH") + 1] if b"MATCH" in args else b"*"
+                keys = [
+                    key
+                    for key in list(store.values)
+                    if fnmatch.fnmatchcase(key, pattern) and store.get(key) is not None
+                ]
+                return [b"0", keys]
+            if name == "DBSIZE":
+                return len(store.values)
+            if name == "FLUSHDB":
+                for key in list(store.values):
+                    store.delete(key)
+                return "OK"
+        except (IndexError, ValueError) as exc:
+            return exc
+        return ValueError(f"unknown command '{name}'")
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Stand-in server, serve_forever() it in a thread for tests"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, password: str | None = None
+    ):
+        handler = type(
+            "BoundRespHandler",
+            (RespHandler,),
+            {"store": Store(), "password": password},
+        )
+        super().__init__((host, port), handler)
+        self.password = password
+
+    @property
+    def url(self) -> str:
+        """redis:// url clients connect to"""
+        host, port = self.server_address[:2]
+        credentials = f":{self.password}@" if self.password else ""
+        return f"redis://{credentials}{host}:{port}/0"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--password", help="Required through AUTH when set")
+    args = parser.parse_args()
+
+    with RespServer(args.host, args.port, args.password) as server:
+        print(f"Listening on {server.url}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
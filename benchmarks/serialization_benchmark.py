@@ -0,0 +1,109 @@
+""" Post List Serialization Benchmark
+
+Compares the per row cost of the old GET /posts response path (ORM object ->
+PostOut.model_validate -> response_model re-validation -> jsonable_encoder ->
+json.dumps) with the row -> dict -> orjson path. No database needed:
+
+    python -m benchmarks.serialization_benchmark
+"""
+import json
+import timeit
+from collections import namedtuple
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.repositories.posts_repository import POST_ROW_COLUMNS
+from app.schemas.posts_schemas import PostOut
+from app.services.posts_service import post_row_to_payload
+from app.utils import json_utils
+
+PostRow = namedtuple("PostRow", [column.key for column in POST_ROW_COLUMNS] + ["rank"])
+posts_adapter = TypeAdapter(list[PostOut])
+
+
+def make_rows(n_rows: int) -> tuple[list, list[PostRow]]:
+    """Returns n_rows fake (ORM like object, n_votes) pairs and the matching rows"""
+    created_at = datetime.now(timezone.utc)
+    orm_rows, post_rows = [], []
+
+    for i in range(n_rows):
+        owner = SimpleNamespace(
+            email=f"user{i}@email.com",
+            password="$2b$12$" + "x" * 53,
+            phone_number=None,
+            id=i,
+            created_at=created_at,
+        )
+        post = SimpleNamespace(
+            title=f"title {i}",
+            content="content " * 20,
+            published=True,
+            rating=i % 5,
+            id=i,
+            created_at=created_at,
+            owner=owner,
+        )
+        orm_rows.append((post, i))
+        post_rows.append(
+            PostRow(
+                post.title,
+                post.content,
+                post.published,
+                post.rating,
+                post.id,
+                created_at,
+                i,
+                owner.email,
+                owner.password,
+                owner.phone_number,
+                owner.id,
+                created_at,
+                1,
+                1,
+                None,
+            )
+        )
+
+    return orm_rows, post_rows
+
+
+def old_path(orm_rows: list) -> bytes:
+    posts = []
+    for post_model, n_votes in orm_rows:
+        post_schema = PostOut.model_validate(post_model)
+        post_schema.n_votes = n_votes
+        posts.append(post_schema)
+
+    # ? What FastAPI does with response_model=list[PostOut] before JSONResponse
+    validated_posts = posts_adapter.validate_python(posts)
+    return json.dumps(jsonable_encoder(validated_posts)).encode()
+
+
+def fast_path(post_rows: list[PostRow]) -> bytes:
+    return json_utils.dumps([post_row_to_payload(post_row) for post_row in post_rows])
+
+
+def run(n_rows: int, repeat: int = 5, number: int = 20) -> dict:
+    orm_rows, post_rows = make_rows(n_rows)
+    assert (
+        json.loads(old_path(orm_rows))[0]["id"]
+        == json.loads(fast_path(post_rows))[0]["id"]
+    )
+
+    results = {"rows": n_rows}
+    for name, func, rows in (
+        ("old_path", old_path, orm_rows),
+        ("fast_path", fast_path, post_rows),
+    ):
+        best = min(timeit.repeat(lambda: func(rows), repeat=repeat, number=number))
+        results[f"{name}_us_per_row"] = round(best / number / n_rows * 1e6, 3)
+
+    results["speedup"] = round(
+        results["old_path_us_per_row"] / results["fast_path_us_per_row"], 1
+    )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps([run(n_rows) for n_rows in (10, 100, 1000)], indent=2))
@@ -1,42 +1,105 @@
+import os
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
 import pytest
+from alembic import command
+from alembic.config import Config
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from httpx import AsyncClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.database.db_config import get_db, Base
+from app.database import db_config
+from app.database.db_config import get_db, get_async_db
+from app.database.db_routing import get_read_db, get_async_read_db, recent_writers
 from app.main import app
 from app.settings import settings
 from app.authentication import oauth2_service
 from app.models.posts_model import PostModel
+from app.monitoring.sql_instrumentation import instrument_engine
+from app.services import posts_service, users_service
 
-DB_TEST_URL = (
-    f"postgresql://"
-    f"{settings.DB_USERNAME}:{settings.DB_PASSWORD}@"
-    f"{settings.DB_HOSTNAME}:{settings.DB_PORT}/"
-    f"{settings.DB_TEST_NAME}"
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+# ? pytest -n auto -> every xdist worker (gw0, gw1...) gets its own database
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+DB_TEST_NAME = (
+    f"{settings.DB_TEST_NAME}_{XDIST_WORKER}" if XDIST_WORKER else settings.DB_TEST_NAME
 )
 
+
+def db_url(db_name: str) -> str:
+    return (
+        f"postgresql://"
+        f"{settings.DB_USERNAME}:{settings.DB_PASSWORD}@"
+        f"{settings.DB_HOSTNAME}:{settings.DB_PORT}/"
+        f"{db_name}"
+    )
+
+
+DB_TEST_URL = db_url(DB_TEST_NAME)
+ASYNC_DB_TEST_URL = DB_TEST_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
 Engine = create_engine(DB_TEST_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=Engine)
+instrument_engine(Engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 test_email = "test@email.com"
 test_email2 = "test2@email.com"
 test_password = "testPassword1"
 
 
+@pytest.fixture(name="migrated_db", scope="session")
+def migrated_db():
+    """Creates the test database if needed and migrates it to head, once per run"""
+    admin_engine = create_engine(db_url("postgres"), isolation_level="AUTOCOMMIT")
+    with admin_engine.connect() as connection:
+        db_exists = connection.scalar(
+            text("SELECT 1 FROM pg_database WHERE datname = :db_name"),
+            {"db_name": DB_TEST_NAME},
+        )
+        if not db_exists:
+            connection.execute(text(f'CREATE DATABASE "{DB_TEST_NAME}"'))
+    admin_engine.dispose()
+
+    alembic_config = Config(str(ROOT_DIR / "alembic.ini"))
+    alembic_config.set_main_option("script_location", str(ROOT_DIR / "alembic"))
+
+    with Engine.begin() as connection:
+        # ? Whatever older runs left behind (create_all tables included) goes away
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+        # ? Same migrations as production, not Base.metadata.create_all
+        alembic_config.attributes["connection"] = connection
+        command.upgrade(alembic_config, "head")
+
+    yield
+    Engine.dispose()
+
+
 @pytest.fixture(name="session")
-def session():
+def session(migrated_db):
     print("\n\nNEW SESSION\n")
-    Base.metadata.drop_all(bind=Engine)
-    Base.metadata.create_all(bind=Engine)
-    db = TestingSessionLocal()
+    connection = Engine.connect()
+    transaction = connection.begin()
+    # ? commit()/rollback() in the services only release/roll back a SAVEPOINT,
+    # ? the outer transaction is rolled back once the test is over
+    db = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    # ? Users of earlier tests are gone, so are their cached rows
+    users_service.user_cache.clear()
+    posts_service.post_cache.clear()
+    recent_writers.clear()
     try:
         yield db
     finally:
         db.close()
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture(name="client")
-def client(session):
+def client(session, monkeypatch):
     def override_get_db():
         try:
             yield session
@@ -44,11 +107,59 @@ def client(session):
             session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    # ? Async routes get the sync test session too, run_in_session handles both
+    app.dependency_overrides[get_async_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_read_db] = override_get_db
+    # ? Single flights open sessions of their own, within the test transaction too
+    monkeypatch.setitem(
+        db_config.SESSION_FACTORIES,
+        session.bind,
+        partial(
+            TestingSessionLocal,
+            bind=session.bind,
+            join_transaction_mode="create_savepoint",
+        ),
+    )
     # 1 yield -> run code before running tests
     yield TestClient(app)
     # 2 yield -> run code after tests finish
 
 
+@pytest.fixture(name="async_client")
+async def async_client(migrated_db, monkeypatch):
+    """Client whose routes all get a real AsyncSession (asyncpg, run_sync), whatever
+    DB_ASYNC_ENABLED says. Same loop as the test: drive it from anyio tests"""
+    async_engine = create_async_engine(ASYNC_DB_TEST_URL)
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        async_session_local = async_sessionmaker(
+            bind=connection,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        db = async_session_local()
+        users_service.user_cache.clear()
+        posts_service.post_cache.clear()
+        recent_writers.clear()
+
+        async def override_get_async_db():
+            yield db
+
+        for dependency in (get_db, get_async_db, get_read_db, get_async_read_db):
+            monkeypatch.setitem(
+                app.dependency_overrides, dependency, override_get_async_db
+            )
+        monkeypatch.setitem(db_config.SESSION_FACTORIES, db.bind, async_session_local)
+        try:
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                yield client
+        finally:
+            await db.close()
+            await transaction.rollback()
+    await async_engine.dispose()
+
+
 @pytest.fixture(name="test_user")
 def test_user(client):
     new_user_data = {"email": test_email, "password": test_password}
@@ -112,3 +223,26 @@ def test_posts(session, test_user, test_user2):
 
     db_post_list = session.query(PostModel).all()
     return db_post_list
+
+
+@pytest.fixture(name="count_statements")
+def count_statements():
+    @contextmanager
+    def statements_counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    return statements_counter
+
+
+@pytest.fixture(name="anyio_backend")
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,41 @@
+import pytest
+from app.schemas.posts_schemas import PostOut
+
+
+@pytest.mark.anyio
+async def test_routes_on_async_session(async_client):
+    user_data = {"email": "async@email.com", "password": "asyncPassword1"}
+    res = await async_client.post("/users", json=user_data)
+    assert res.status_code == 201
+    user_id = res.json()["id"]
+
+    res = await async_client.post(
+        "/login", data={"username": user_data["email"], "password": "asyncPassword1"}
+    )
+    assert res.status_code == 200
+    async_client.headers["Authorization"] = f"Bearer {res.json()['access_token']}"
+
+    res = await async_client.post(
+        "/posts", json={"title": "async title", "content": "async content"}
+    )
+    assert res.status_code == 201
+    post_id = res.json()["id"]
+
+    res = await async_client.post("/votes", json={"post_id": post_id, "dir": 1})
+    assert res.status_code == 201
+
+    # ? Single post, latest post (single flight, its own session) and first page
+    for url in (f"/posts/{post_id}", "/posts/latest"):
+        res = await async_client.get(url)
+        post = PostOut(**res.json())
+        assert res.status_code == 200
+        assert post.id == post_id
+        assert post.owner.id == user_id
+        assert post.n_votes == 1
+
+    res = await async_client.get("/posts")
+    assert res.status_code == 200
+    assert [post["id"] for post in res.json()] == [post_id]
+
+    res = await async_client.delete(f"/users/{user_id}")
+    assert res.status_code == 204
@@ -0,0 +1,63 @@
+import time
+from app.utils.cache_utils import TTLCache
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set(1, "user")
+
+    assert cache.get(1) == "user"
+    assert cache.get(2) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set(1, "first")
+    cache.set(2, "second")
+    cache.get(1)
+    cache.set(3, "third")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "first"
+    assert cache.get(3) == "third"
+
+
+def test_cache_entries_expire():
+    cache = TTLCache(max_size=10, ttl_seconds=0.01)
+    cache.set(1, "user")
+    time.sleep(0.02)
+
+    assert cache.get(1) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_delete():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set(1, "user")
+    cache.delete(1)
+
+    assert cache.get(1) is None
+
+
+def test_cache_skips_values_loaded_before_an_invalidation():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    version = cache.version
+    cache.delete(1)
+    cache.set(1, "stale", version)
+
+    assert cache.get(1) is None
+
+    cache.set(1, "fresh", cache.version)
+    assert cache.get(1) == "fresh"
+
+
+def test_cache_delete_where_and_peek():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set(1, {"owner_id": 1})
+    cache.set(2, {"owner_id": 2})
+    cache.delete_where(lambda value: value["owner_id"] == 1)
+
+    assert cache.peek(1) is None
+    assert cache.peek(2) == {"owner_id": 2}
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 1}
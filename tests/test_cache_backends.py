@@ -0,0 +1,288 @@
+import asyncio
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+import pytest
+from sqlalchemy.util import greenlet_spawn
+from app.cache.codecs import PostCodec, UserCodec
+from app.cache.redis_backend import RedisCache
+from app.cache.resp_client import RespClient, RespError
+from app.cache.shared_memory_backend import SharedMemoryCache
+from app.schemas.posts_schemas import PostOut
+from app.schemas.users_schemas import UserOut
+from benchmarks.resp_stand_in import RespServer
+
+
+def make_user(user_id: int, **kwargs) -> UserOut:
+    return UserOut(
+        email=f"user{user_id}@email.com",
+        password="$2b$12$" + "x" * 53,
+        id=user_id,
+        created_at=datetime(2023, 7, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        **kwargs,
+    )
+
+
+def cached_user(user: UserOut) -> UserOut:
+    """user as UserCodec() gives it back, without its password hash"""
+    return user.model_copy(update={"password": ""})
+
+
+def make_post(post_id: int, owner: UserOut, **kwargs) -> PostOut:
+    return PostOut(
+        id=post_id,
+        created_at=datetime(2023, 7, 2, 8, 0, 0, 42),
+        owner=owner,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize(
+    "user",
+    [make_user(1), make_user(2, phone_number="+39 333 1234567", version=4)],
+)
+def test_user_codec_round_trip(user):
+    codec = UserCodec()
+    data = codec.encode(user)
+
+    assert codec.decode(data) == cached_user(user)
+    assert user.password.encode() not in data
+    assert len(data) < len(user.model_dump_json())
+
+    codec = UserCodec(with_password=True)
+
+    assert codec.decode(codec.encode(user)) == user
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"title": "Ciao", "content": "è tutto ok", "rating": 0, "n_votes": 3},
+        {"title": "Edited", "version": 12},
+        {"title": "", "published": True, "rating": -1},
+        {"published": None},
+    ],
+)
+def test_post_codec_round_trip(kwargs):
+    codec = PostCodec()
+    post = make_post(7, make_user(1), **kwargs)
+    decoded = codec.decode(codec.encode(post))
+
+    assert decoded == post
+    # ? Naive datetimes stay naive, aware ones stay aware
+    assert decoded.created_at.tzinfo is None
+    assert decoded.owner.created_at.tzinfo is timezone.utc
+
+
+@pytest.fixture
+def shared_caches(tmp_path):
+    name = f"test_cache_{uuid.uuid4().hex[:8]}"
+    # ? Two instances on the same segment, as two worker processes would be
+    first = SharedMemoryCache(name, 16, 60, UserCodec(), 256, str(tmp_path))
+    second = SharedMemoryCache(name, 16, 60, UserCodec(), 256, str(tmp_path))
+    yield first, second
+    second.close()
+    first.close()
+    first.unlink()
+
+
+def test_shared_memory_cache_is_shared(shared_caches):
+    first, second = shared_caches
+    first.set(1, make_user(1))
+
+    assert second.get(1) == cached_user(make_user(1))
+    assert second.get(2) is None
+    assert second.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    second.delete(1)
+
+    assert first.get(1) is None
+
+
+def test_shared_memory_cache_version_is_shared(shared_caches):
+    first, second = shared_caches
+    version = first.version
+    second.delete(1)
+    first.set(1, make_user(1), version)
+
+    assert first.get(1) is None
+
+    first.set(1, make_user(1), first.version)
+
+    assert second.get(1) == cached_user(make_user(1))
+
+
+def test_shared_memory_cache_delete_where(shared_caches):
+    first, second = shared_caches
+    for user_id in range(1, 5):
+        first.set(user_id, make_user(user_id))
+
+    second.delete_where(lambda user: user.id % 2 == 0)
+
+    assert [first.peek(user_id) is not None for user_id in range(1, 5)] == [
+        True,
+        False,
+        True,
+        False,
+    ]
+
+    second.clear()
+
+    assert first.stats()["size"] == 0
+
+
+def test_shared_memory_cache_entries_expire(tmp_path):
+    name = f"test_cache_{uuid.uuid4().hex[:8]}"
+    cache = SharedMemoryCache(name, 16, 0.01, UserCodec(), 256, str(tmp_path))
+    try:
+        cache.set(1, make_user(1))
+        time.sleep(0.02)
+
+        assert cache.get(1) is None
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+def test_shared_memory_cache_refuses_foreign_segments(tmp_path):
+    name = f"test_cache_{uuid.uuid4().hex[:8]}"
+    cache = SharedMemoryCache(name, 16, 60, UserCodec(), 256, str(tmp_path))
+    segment_name = cache.segment_name
+    cache.close()
+    cache.unlink()
+    foreign = shared_memory.SharedMemory(segment_name, create=True, size=64)
+    try:
+        with pytest.raises(ValueError) as exc_info:
+            SharedMemoryCache(name, 16, 60, UserCodec(), 256, str(tmp_path))
+
+        assert isinstance(exc_info.value.__cause__, FileExistsError)
+    finally:
+        foreign.close()
+        foreign.unlink()
+
+
+def test_shared_memory_cache_skips_values_larger_than_a_slot(shared_caches):
+    first, _ = shared_caches
+    first.set(1, make_user(1, phone_number="1" * 256))
+
+    assert first.get(1) is None
+
+
+@pytest.fixture
+def resp_server():
+    server = RespServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def redis_cache(resp_server):
+    cache = RedisCache("post", 60, PostCodec(), RespClient.from_url(resp_server.url))
+    yield cache
+    cache.close()
+
+
+def test_redis_cache_get_set_delete(redis_cache):
+    post = make_post(1, make_user(1), title="title")
+    redis_cache.set(1, post)
+
+    assert redis_cache.get(1) == post
+    assert redis_cache.get(2) is None
+
+    redis_cache.delete(1)
+
+    assert redis_cache.get(1) is None
+    assert redis_cache.stats() == {"hits": 1, "misses": 2, "size": None}
+
+
+def test_redis_cache_version_aborts_stale_sets(redis_cache):
+    post = make_post(1, make_user(1))
+    version = redis_cache.version
+    redis_cache.delete(2)
+    redis_cache.set(1, post, version)
+
+    assert redis_cache.get(1) is None
+
+    redis_cache.set(1, post, redis_cache.version)
+
+    assert redis_cache.get(1) == post
+
+
+def test_redis_cache_delete_where(redis_cache):
+    for post_id in range(1, 5):
+        redis_cache.set(post_id, make_post(post_id, make_user(post_id % 2)))
+
+    redis_cache.delete_where(lambda post: post.owner.id == 0)
+
+    assert [redis_cache.peek(post_id) is not None for post_id in range(1, 5)] == [
+        True,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_redis_cache_unreachable_server_is_a_miss(resp_server):
+    host, port = resp_server.server_address[:2]
+    resp_server.shutdown()
+    resp_server.server_close()
+    cache = RedisCache("post", 60, PostCodec(), RespClient(host, port))
+
+    cache.set(1, make_post(1, make_user(1)))
+
+    assert cache.get(1) is None
+    assert cache.version == -1
+
+
+@pytest.mark.anyio
+async def test_redis_cache_io_leaves_the_loop_inside_run_sync(redis_cache, monkeypatch):
+    execute = redis_cache.client.execute
+    io_threads = []
+
+    def slow_execute(*command):
+        io_threads.append(threading.get_ident())
+        time.sleep(0.05)
+        return execute(*command)
+
+    monkeypatch.setattr(redis_cache.client, "execute", slow_execute)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticker = asyncio.ensure_future(tick())
+    # ? What AsyncSession.run_sync does with the services
+    await greenlet_spawn(lambda: redis_cache.get(1))
+    ticker.cancel()
+
+    assert io_threads and threading.get_ident() not in io_threads
+    assert ticks > 2
+
+
+def test_resp_client_authenticates():
+    server = RespServer(password="s3cret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    try:
+        client = RespClient.from_url(server.url)
+        client.execute("SET", "key", "value")
+
+        assert (client.username, client.password) == (None, "s3cret")
+        assert client.execute("GET", "key") == b"value"
+        with pytest.raises(RespError):
+            RespClient(host, port).execute("GET", "key")
+
+        acl_client = RespClient.from_url(f"redis://app:s3cret@{host}:{port}/1")
+
+        assert acl_client.execute("GET", "key") == b"value"
+    finally:
+        server.shutdown()
+        server.server_close()
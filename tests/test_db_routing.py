@@ -0,0 +1,63 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.authentication import oauth2_service
+from app.database import db_config
+from app.database.db_routing import reads_from_primary, recent_writers, stick_to_primary
+from app.services.posts_service import (
+    LATEST_POST_KEY,
+    get_latest_post_with_n_votes,
+    post_cache,
+)
+
+
+def test_reads_stick_to_primary_after_own_write():
+    recent_writers.clear()
+    app = FastAPI()
+
+    @app.post("/write")
+    async def write(user_id: int | None = Depends(oauth2_service.get_token_user_id)):
+        if user_id is not None:
+            await stick_to_primary(user_id)
+        return None
+
+    @app.get("/read")
+    def read(user_id: int | None = Depends(oauth2_service.get_token_user_id)):
+        return reads_from_primary(user_id)
+
+    client = TestClient(app)
+    headers = {
+        "Authorization": f"Bearer {oauth2_service.create_access_token({'user_id': 1})}"
+    }
+
+    assert client.get("/read", headers=headers).json() is False
+    client.post("/write", headers=headers)
+    # ? Recorded before the write's response, not after it was sent
+    assert client.get("/read", headers=headers).json() is True
+
+    client.post("/write", headers={"Authorization": "Bearer not-a-jwt"})
+    client.post("/write")
+
+    assert not reads_from_primary(2)
+    assert not reads_from_primary(None)
+    assert recent_writers.stats()["size"] == 1
+
+
+def test_read_your_writes_sessions_bypass_post_cache(monkeypatch):
+    replica_engine = create_engine("sqlite://")
+    monkeypatch.setattr(db_config, "REPLICA_ENGINES", frozenset({replica_engine}))
+    post_cache.clear()
+    post_cache.set(LATEST_POST_KEY, "cached", post_cache.version)
+    replica_session = Session(bind=replica_engine)
+    primary_session = Session(bind=create_engine("sqlite://"))
+
+    assert not db_config.routed_to_primary(replica_session)
+    assert db_config.routed_to_primary(primary_session)
+    assert get_latest_post_with_n_votes(replica_session) == "cached"
+    # ? Straight to the (empty) primary instead of the cached post
+    with pytest.raises(OperationalError):
+        get_latest_post_with_n_votes(primary_session)
+    post_cache.clear()
@@ -0,0 +1,31 @@
+import pytest
+from app.utils.etag_utils import etag_matches, hash_etag, make_etag
+
+
+def test_make_etag_is_strong_and_quoted():
+    assert make_etag(1, 2, 3) == '"1.2.3"'
+
+
+def test_hash_etag_changes_with_any_item():
+    etag = hash_etag([(1, 1, 1), (2, 1, 1)])
+
+    assert etag == hash_etag([(1, 1, 1), (2, 1, 1)])
+    assert etag != hash_etag([(1, 1, 1), (2, 2, 1)])
+    assert etag != hash_etag([(2, 1, 1), (1, 1, 1)])
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [
+        (None, False),
+        ("", False),
+        ('"1.2"', True),
+        ('W/"1.2"', True),
+        ('"0.1", "1.2"', True),
+        ("*", True),
+        ('"1.3"', False),
+        ("1.2", False),
+    ],
+)
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, '"1.2"') is matches
@@ -0,0 +1,13 @@
+import pytest
+from app.exceptions.http_exceptions import BadRequestException
+from app.utils.ids_utils import parse_ids
+
+
+def test_parse_ids():
+    assert parse_ids("3,1,3,,2", 10) == [3, 1, 2]
+
+
+@pytest.mark.parametrize("ids", ["", "1,a", "1,2,3"])
+def test_parse_invalid_ids(ids):
+    with pytest.raises(BadRequestException):
+        parse_ids(ids, 2)
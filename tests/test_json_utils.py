@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from pydantic import TypeAdapter
+from app.utils.json_utils import dumps
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        datetime(2023, 7, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        datetime(2023, 7, 1, 12, 30, 15, tzinfo=timezone.utc),
+        datetime(2023, 7, 1, 12, 30, 15, tzinfo=timezone(timedelta(hours=2))),
+        datetime(2023, 7, 1, 12, 30, 15),
+    ],
+)
+def test_datetimes_match_response_model_serialization(value):
+    assert dumps(value) == TypeAdapter(datetime).dump_json(value)
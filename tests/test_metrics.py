@@ -0,0 +1,172 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from httpx import AsyncClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.main import app
+from app.monitoring.metrics_registry import MetricsRegistry, metrics
+from app.monitoring.pool_instrumentation import TimedQueuePool, pool_stats_collector
+from app.monitoring.sql_instrumentation import (
+    DbTimingMiddleware,
+    instrument_engine,
+    normalize_sql,
+    params_shape,
+)
+from app.settings import settings
+
+
+def test_metrics_endpoint_reports_routes():
+    client = TestClient(app)
+    client.get("/")
+    res = client.get("/metrics")
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in res.text
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/",le="+Inf"}'
+        in res.text
+    )
+    assert 'cache_hits_total{cache="user"}' in res.text
+    assert 'cache_hits_total{cache="post"}' in res.text
+
+
+def test_histogram_is_cumulative():
+    registry = MetricsRegistry()
+    for value in (0.001, 0.2, 3):
+        registry.observe("latency", "Latency", {"route": "/"}, value, (0.01, 1.0))
+
+    samples = registry.snapshot()["latency"]["samples"]
+    assert samples['latency_bucket{route="/",le="0.01"}'] == 1
+    assert samples['latency_bucket{route="/",le="1.0"}'] == 2
+    assert samples['latency_bucket{route="/",le="+Inf"}'] == 3
+    assert samples['latency_count{route="/"}'] == 3
+
+
+def test_metrics_are_merged_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    registry = MetricsRegistry()
+    registry.inc("requests", "Requests", {"route": "/"}, 2)
+    registry.add("in_flight", "In flight", {}, 1)
+
+    # ? Snapshot left behind by a worker that is gone (no process has pid 2**22 + 1)
+    dead_worker = MetricsRegistry()
+    dead_worker.inc("requests", "Requests", {"route": "/"}, 3)
+    dead_worker.add("in_flight", "In flight", {}, 5)
+    monkeypatch.setattr(os, "getpid", lambda: 2**22 + 1)
+    dead_worker.flush()
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+
+    families = registry.collect()
+    assert families["requests"]["samples"]['requests{route="/"}'] == 5
+    assert families["in_flight"]["samples"]["in_flight"] == 1
+
+    # ? The dead worker's counters moved to the archive, once
+    assert not (tmp_path / f"metrics_{2**22 + 1}.json").exists()
+    assert registry.collect() == families
+
+
+def test_metrics_are_flushed_by_a_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "METRICS_FLUSH_SECONDS", 60)
+    registry = MetricsRegistry()
+    registry.inc("requests", "Requests", {"route": "/"})
+
+    registry.start_flushing()
+    assert not list(tmp_path.iterdir())
+    registry.stop_flushing()
+
+    # ? Stopping writes a last snapshot
+    assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+
+
+def test_normalize_sql():
+    statement = """SELECT posts.id FROM posts
+        WHERE posts.title = 'a ''quoted'' title' AND posts.id IN (%(id_1)s, %(id_2)s)
+        LIMIT 10"""
+
+    assert normalize_sql(statement) == (
+        "SELECT posts.id FROM posts WHERE posts.title = ? AND posts.id IN (?) LIMIT ?"
+    )
+    # ? asyncpg placeholders
+    assert (
+        normalize_sql(
+            "SELECT users.id FROM users WHERE users.id IN ($1::INTEGER, $2::INTEGER) "
+            "LIMIT $3::INTEGER"
+        )
+        == "SELECT users.id FROM users WHERE users.id IN (?) LIMIT ?::INTEGER"
+    )
+
+
+def test_failed_statements_leave_no_start_time_behind():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+
+        assert not connection.info
+
+
+def test_params_shape_hides_values():
+    assert params_shape({"email": "a@b.c", "id": 1}) == {"email": "str", "id": "int"}
+    assert params_shape([{"id": 1}, {"id": 2}]) == "2 x {'id': 'int'}"
+
+
+@pytest.mark.anyio
+async def test_db_timing_middleware_counts_statements(monkeypatch, caplog):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_SECONDS", 0)
+
+    async def endpoint(scope, receive, send):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT :value"), {"value": "secret"})
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async with AsyncClient(
+        app=DbTimingMiddleware(endpoint), base_url="http://test"
+    ) as client:
+        res = await client.get("/")
+
+    assert res.headers["server-timing"].endswith('desc="2 queries"')
+    # ? sqlite3 takes positional params, psycopg2 a dict
+    assert "SELECT ? | params: ['str']" in caplog.text
+    assert "secret" not in caplog.text
+
+
+def test_pool_stats_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    timeout_sample = 'db_pool_timeouts_total{pool="sync"}'
+    timeouts = metrics.snapshot().get("db_pool_timeouts_total", {"samples": {}})
+    n_timeouts = timeouts["samples"].get(timeout_sample, 0)
+
+    with engine.connect():
+        families = pool_stats_collector(engine)
+        assert families["db_pool_checked_out"]["samples"] == {
+            'db_pool_checked_out{pool="sync"}': 1
+        }
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    families = metrics.snapshot()
+    assert families["db_pool_timeouts_total"]["samples"][timeout_sample] == (
+        n_timeouts + 1
+    )
+    assert 'db_pool_wait_seconds_count{pool="sync"}' in (
+        families["db_pool_wait_seconds"]["samples"]
+    )
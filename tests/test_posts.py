@@ -1,5 +1,10 @@
+import csv
+import io
+import json
 import pytest
+from app.database.db_routing import reads_from_primary
 from app.schemas.posts_schemas import PostOut
+from app.services import posts_service
 
 # 5 GET
 
@@ -12,6 +17,42 @@ def test_get_all_posts(authorized_client, test_posts, test_user):
     assert res.status_code == 200
 
 
+def test_get_posts_datetimes_match_get_post(authorized_client, test_posts):
+    listed_post = authorized_client.get("/posts").json()[0]
+    post = authorized_client.get(f"/posts/{listed_post['id']}").json()
+
+    assert listed_post["created_at"] == post["created_at"]
+    assert listed_post["owner"]["created_at"] == post["owner"]["created_at"]
+
+
+def test_get_posts_statement_count_is_constant(
+    authorized_client, session, test_posts, count_statements
+):
+    # ? Warms the current user cache up
+    authorized_client.get("/posts")
+    n_statements = []
+
+    for limit in (1, len(test_posts)):
+        # ? No owner left in the identity map by earlier requests
+        session.expunge_all()
+        with count_statements() as statements:
+            res = authorized_client.get("/posts", params={"limit": limit})
+
+        assert len(res.json()) == limit
+        n_statements.append(len(statements))
+
+    assert n_statements[0] == n_statements[1]
+
+
+def test_get_posts_server_timing(authorized_client, test_posts, count_statements):
+    with count_statements() as statements:
+        res = authorized_client.get("/posts")
+
+    assert res.status_code == 200
+    assert res.headers["Server-Timing"].startswith("db;dur=")
+    assert res.headers["Server-Timing"].endswith(f'desc="{len(statements)} queries"')
+
+
 def test_unauthorized_user_get_all_posts(client, test_posts):
     res = client.get("/posts")
     print(res.json())
@@ -44,6 +85,83 @@ def test_unauthorized_user_get_post(client, test_posts):
     assert res.status_code == 401
 
 
+def test_get_post_etag(authorized_client, test_posts):
+    post_url = f"/posts/{test_posts[0].id}"
+    etag = authorized_client.get(post_url).headers["ETag"]
+
+    res = authorized_client.get(post_url, headers={"If-None-Match": etag})
+
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["ETag"] == etag
+
+    authorized_client.post("/votes", json={"post_id": test_posts[0].id, "dir": 1})
+    res = authorized_client.get(post_url, headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert res.json()["n_votes"] == 1
+
+
+def test_get_post_not_modified_loads_versions_only(
+    authorized_client, test_posts, count_statements
+):
+    post_url = f"/posts/{test_posts[0].id}"
+    etag = authorized_client.get(post_url).headers["ETag"]
+    posts_service.post_cache.clear()
+
+    with count_statements() as statements:
+        res = authorized_client.get(post_url, headers={"If-None-Match": etag})
+
+    assert res.status_code == 304
+    assert len(statements) == 1
+    assert "posts.content" not in statements[0]
+
+
+def test_get_posts_by_ids(authorized_client, test_posts, count_statements):
+    # ? Warms the current user cache up
+    authorized_client.get("/posts/latest")
+    posts_service.post_cache.clear()
+    ids = [test_posts[2].id, test_posts[0].id, 666]
+
+    with count_statements() as statements:
+        res = authorized_client.get("/posts", params={"ids": ",".join(map(str, ids))})
+
+    assert res.status_code == 200
+    assert [post["id"] for post in res.json()] == ids[:2]
+    assert PostOut(**res.json()[0]).title == test_posts[2].title
+    assert len(statements) == 1
+    assert " IN " in statements[0]
+
+    res = authorized_client.get(
+        "/posts",
+        params={"ids": ",".join(map(str, ids))},
+        headers={"If-None-Match": res.headers["ETag"]},
+    )
+
+    assert res.status_code == 304
+
+
+def test_get_posts_by_invalid_ids(authorized_client):
+    res = authorized_client.get("/posts", params={"ids": "1,two"})
+
+    assert res.status_code == 400
+
+
+def test_get_posts_etag(authorized_client, test_posts):
+    etag = authorized_client.get("/posts").headers["ETag"]
+
+    res = authorized_client.get("/posts", headers={"If-None-Match": etag})
+
+    assert res.status_code == 304
+
+    authorized_client.put(f"/posts/{test_posts[0].id}", json={"title": "edited"})
+    res = authorized_client.get("/posts", headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
 # 5 POST
 
 
@@ -98,6 +216,65 @@ def test_update_post(authorized_client, test_user, test_posts):
     assert updated_post.content == payload["content"]
 
 
+def test_read_after_update_post_goes_to_primary(
+    authorized_client, test_user, test_posts
+):
+    assert not reads_from_primary(test_user["id"])
+
+    authorized_client.put(f"/posts/{test_posts[0].id}", json={"title": "updated"})
+    res = authorized_client.get(f"/posts/{test_posts[0].id}")
+
+    assert reads_from_primary(test_user["id"])
+    assert res.json()["title"] == "updated"
+
+
+def test_update_post_is_a_single_statement(
+    authorized_client, test_posts, count_statements
+):
+    # ? Warms the current user cache up
+    authorized_client.get("/posts/latest")
+
+    with count_statements() as statements:
+        res = authorized_client.put(
+            f"/posts/{test_posts[0].id}", json={"title": "updated title"}
+        )
+
+    queries = [
+        statement for statement in statements if "SAVEPOINT" not in statement.upper()
+    ]
+    assert res.status_code == 200
+    assert res.json()["title"] == "updated title"
+    assert res.json()["content"] == test_posts[0].content
+    assert len(queries) == 1
+    assert queries[0].startswith("UPDATE posts")
+
+
+def test_cached_post_is_invalidated_by_writes(
+    authorized_client, test_posts, count_statements
+):
+    post_url = f"/posts/{test_posts[2].id}"
+    authorized_client.get(post_url)
+    authorized_client.get("/posts/latest")
+
+    with count_statements() as statements:
+        assert authorized_client.get(post_url).status_code == 200
+        assert authorized_client.get("/posts/latest").status_code == 200
+    assert not statements
+
+    authorized_client.put(post_url, json={"title": "cached title"})
+    assert authorized_client.get(post_url).json()["title"] == "cached title"
+
+    res = authorized_client.post("/posts", json={"title": "newest", "content": "c"})
+    latest_url = f"/posts/{res.json()['id']}"
+    assert authorized_client.get("/posts/latest").json()["title"] == "newest"
+
+    authorized_client.put(latest_url, json={"title": "updated newest"})
+    assert authorized_client.get("/posts/latest").json()["title"] == "updated newest"
+
+    authorized_client.delete(post_url)
+    assert authorized_client.get(post_url).status_code == 404
+
+
 def test_update_other_user_post(authorized_client, test_user, test_posts):
     payload = {
         "title": "updated title",
@@ -161,3 +338,72 @@ def test_delete_other_user_post(authorized_client, test_user, test_posts):
     res = authorized_client.delete(f"/posts/{test_posts[3].id}")
 
     assert res.status_code == 403
+
+
+def test_get_posts_with_cursor(authorized_client, test_posts):
+    first_page = authorized_client.get("/posts", params={"limit": 3})
+    next_cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = authorized_client.get(
+        "/posts", params={"limit": 3, "cursor": next_cursor}
+    )
+    post_ids = [post["id"] for post in first_page.json() + second_page.json()]
+
+    assert second_page.status_code == 200
+    assert post_ids == sorted(post.id for post in test_posts)
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_get_posts_with_invalid_cursor(authorized_client, test_posts):
+    res = authorized_client.get("/posts", params={"cursor": "not-a-cursor"})
+
+    assert res.status_code == 400
+
+
+def test_search_posts(authorized_client, test_posts):
+    res = authorized_client.get("/posts", params={"search": "SECOND"})
+
+    assert res.status_code == 200
+    assert [post["title"] for post in res.json()] == ["second title"]
+
+
+def test_search_posts_with_cursor(authorized_client, test_posts):
+    params = {"search": "title", "limit": 2}
+    first_page = authorized_client.get("/posts", params=params)
+    second_page = authorized_client.get(
+        "/posts", params={**params, "cursor": first_page.headers["X-Next-Cursor"]}
+    )
+    post_ids = [post["id"] for post in first_page.json() + second_page.json()]
+
+    assert sorted(post_ids) == sorted(post.id for post in test_posts)
+
+
+# 5 EXPORT
+
+
+def test_export_posts_ndjson(authorized_client, test_posts):
+    res = authorized_client.get("/posts/export")
+    posts = [json.loads(line) for line in res.text.splitlines()]
+
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    assert [post["id"] for post in posts] == sorted(post.id for post in test_posts)
+    assert all("n_votes" in post for post in posts)
+
+
+def test_export_posts_csv(authorized_client, test_posts):
+    res = authorized_client.get("/posts/export", params={"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert [int(row["id"]) for row in rows] == sorted(post.id for post in test_posts)
+
+    post = authorized_client.get(f"/posts/{rows[0]['id']}").json()
+    assert rows[0]["created_at"] == post["created_at"]
+
+
+def test_unauthorized_user_export_posts(client, test_posts):
+    res = client.get("/posts/export")
+
+    assert res.status_code == 401
@@ -0,0 +1,81 @@
+import os
+import uuid
+from multiprocessing import shared_memory
+import pytest
+from fastapi.testclient import TestClient
+from gunicorn.util import load_class
+from app.cache.codecs import UserCodec
+from app.cache.shared_memory_backend import SharedMemoryCache
+from app.database.db_config import AsyncEngine, AsyncReadEngine, Engine, ReadEngine
+from app.main import app
+from app.server import TunedUvicornWorker, default_workers, on_exit, server_options
+from app.settings import settings
+from app.utils import password_utils
+from app import startup
+
+
+def test_server_options(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", None)
+    options = server_options()
+
+    assert options["workers"] == default_workers() >= 1
+    assert options["preload_app"] is settings.SERVER_PRELOAD
+    assert load_class(options["worker_class"]) is TunedUvicornWorker
+    assert TunedUvicornWorker.CONFIG_KWARGS["loop"] == "uvloop"
+
+
+def test_lifespan_shutdown_disposes_resources(monkeypatch):
+    monkeypatch.setattr(settings, "STARTUP_WARMUP_ENABLED", False)
+    engines = {
+        Engine,
+        ReadEngine,
+        AsyncEngine.sync_engine,
+        AsyncReadEngine.sync_engine,
+    }
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        password_utils.get_password_pool()
+        pools = {engine: engine.pool for engine in engines}
+
+    # ? dispose() swaps in a fresh pool, the old one is closed
+    assert all(engine.pool is not pools[engine] for engine in engines)
+    assert password_utils._pool is None  # pylint: disable=protected-access
+
+
+def test_on_exit_unlinks_segments_workers_left_behind(monkeypatch, tmp_path):
+    namespace = f"test_server_{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "shared_memory")
+    monkeypatch.setattr(settings, "CACHE_NAMESPACE", namespace)
+    monkeypatch.setattr(settings, "CACHE_SHM_LOCK_DIR", str(tmp_path))
+    # ? A worker built it and exited, this process never attached to it
+    cache = SharedMemoryCache(
+        f"{namespace}_users", 16, 60, UserCodec(), 256, str(tmp_path)
+    )
+    segment_name = cache.segment_name
+    cache.close()
+
+    on_exit(None)
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(segment_name)
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.anyio
+async def test_warm_up_survives_failing_steps(monkeypatch):
+    async def failing_step():
+        raise ConnectionRefusedError("DB not up yet")
+
+    monkeypatch.setattr(settings, "PASSWORD_POOL_SIZE", 1)
+    monkeypatch.setattr(
+        startup,
+        "WARMUP_STEPS",
+        {"db_pool": failing_step, "password_pool": startup.warm_password_pool},
+    )
+    monkeypatch.setattr(startup, "startup_timings", {})
+
+    await startup.warm_up()
+
+    assert "db_pool" not in startup.startup_timings
+    assert startup.startup_timings["password_pool"] > 0
+    assert startup.startup_timings["warm_up"] > 0
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import db_config
+from app.monitoring.metrics_registry import metrics
+from app.schemas.posts_schemas import PostOut
+from app.schemas.users_schemas import UserOut
+from app.services import posts_service
+from app.utils.single_flight_utils import SingleFlight
+
+
+def coalesced_count(flight: str) -> float:
+    samples = metrics.snapshot().get("single_flight_coalesced_total", {})
+    return samples.get("samples", {}).get(
+        f'single_flight_coalesced_total{{flight="{flight}"}}', 0
+    )
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_call():
+    flight = SingleFlight("test_shared")
+    n_calls = 0
+
+    async def load():
+        nonlocal n_calls
+        n_calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(flight.run("key", load) for _ in range(10)))
+
+    assert n_calls == 1
+    assert all(result is results[0] for result in results)
+    assert coalesced_count("test_shared") == 9
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.anyio
+async def test_different_keys_and_later_calls_are_not_shared():
+    flight = SingleFlight("test_keys")
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    await asyncio.gather(flight.run(1, lambda: load(1)), flight.run(2, lambda: load(2)))
+    await flight.run(1, lambda: load(1))
+
+    assert calls == [1, 2, 1]
+
+
+@pytest.mark.anyio
+async def test_errors_reach_every_caller():
+    flight = SingleFlight("test_errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flight.run("key", fail) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.anyio
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test_cancel")
+
+    async def load():
+        await asyncio.sleep(0.02)
+        return "post"
+
+    first = asyncio.ensure_future(flight.run("key", load))
+    second = asyncio.ensure_future(flight.run("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "post"
+    assert first.cancelled()
+
+
+@pytest.mark.anyio
+async def test_latest_post_cache_misses_are_coalesced(monkeypatch):
+    posts_service.post_cache.clear()
+    n_queries = 0
+    owner = UserOut(id=1, email="a@b.com", password="x", created_at=datetime.now())
+    latest_post = PostOut(
+        id=1, title="t", content="c", created_at=datetime.now(), owner=owner
+    )
+
+    async def fake_run_in_new_session(bind, func, *args):
+        nonlocal n_queries
+        n_queries += 1
+        # ? A session of the flight's own, on the caller's bind
+        assert bind == "replica"
+        await asyncio.sleep(0.01)
+        return latest_post
+
+    monkeypatch.setattr(posts_service, "run_in_new_session", fake_run_in_new_session)
+    db_session = SimpleNamespace(bind="replica")
+
+    posts = await asyncio.gather(
+        *(
+            posts_service.get_latest_post_with_n_votes_coalesced(db_session)
+            for _ in range(5)
+        )
+    )
+
+    assert n_queries == 1
+    assert posts == [latest_post] * 5
+
+
+@pytest.mark.anyio
+async def test_flight_session_outlives_the_cancelled_caller(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    monkeypatch.setitem(db_config.SESSION_FACTORIES, engine, sessionmaker(bind=engine))
+    flight = SingleFlight("test_session")
+    sessions = []
+
+    def load(db_session):
+        sessions.append(db_session)
+        time.sleep(0.02)
+        return db_session.execute(text("SELECT 1")).scalar()
+
+    first = asyncio.ensure_future(
+        flight.run("key", lambda: db_config.run_in_new_session(engine, load))
+    )
+    second = asyncio.ensure_future(
+        flight.run("key", lambda: db_config.run_in_new_session(engine, load))
+    )
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == 1
+    # ? One query, its session closed by the flight itself
+    assert len(sessions) == 1
+    assert not sessions[0].in_transaction()
@@ -1,7 +1,14 @@
+from datetime import datetime
+import pytest
 from tests.conftest import test_email, test_password
+from app.APIs import users_api
 from app.authentication import oauth2_service
+from app.exceptions.http_exceptions import ServiceUnavailableException
+from app.settings import settings
+from app.utils import password_utils
 from app.schemas.token_schemas import Token
 from app.schemas.users_schemas import UserOut
+from app.services import users_service
 from app.utils.password_utils import verify_password
 
 
@@ -15,6 +22,46 @@ def test_hello_world(client):
     assert res.status_code == 200
 
 
+def test_get_users_with_cursor(client, test_user, test_user2):
+    first_page = client.get("/users", params={"limit": 1})
+    second_page = client.get(
+        "/users", params={"limit": 1, "cursor": first_page.headers["X-Next-Cursor"]}
+    )
+
+    assert first_page.json()[0]["id"] == test_user["id"]
+    assert second_page.json()[0]["id"] == test_user2["id"]
+
+
+def test_get_users_by_ids(client, test_user, test_user2, count_statements):
+    ids = f"{test_user2['id']},{test_user['id']},666"
+
+    with count_statements() as statements:
+        res = client.get("/users", params={"ids": ids})
+
+    assert res.status_code == 200
+    assert [user["id"] for user in res.json()] == [test_user2["id"], test_user["id"]]
+    assert len(statements) == 1
+
+
+def test_get_user_etag(authorized_client, test_user):
+    user_url = f"/users/{test_user['id']}"
+    etag = authorized_client.get(user_url).headers["ETag"]
+
+    res = authorized_client.get(user_url, headers={"If-None-Match": f'W/{etag}, "x"'})
+
+    assert res.status_code == 304
+
+    authorized_client.put(
+        user_url,
+        json={"email": "etag@email.com", "password": test_user["plain_password"]},
+    )
+    res = authorized_client.get(user_url, headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert "version" not in res.json()
+
+
 # 5 POST
 
 
@@ -51,3 +98,79 @@ def test_unauthorized_login(client, test_user):
     print(res.json())
     assert res.status_code == 401
     assert res.json().get("detail") == "Invalid user credentials"
+
+
+# 5 PUT
+
+
+def test_update_user_refreshes_current_user(authorized_client, test_user):
+    new_email = "updated@email.com"
+    # ? Warms the cached current user up
+    authorized_client.get("/posts")
+
+    res = authorized_client.put(
+        f"/users/{test_user['id']}",
+        json={"email": new_email, "password": test_user["plain_password"]},
+    )
+    assert res.status_code == 200
+
+    res = authorized_client.post("/posts", json={"title": "title", "content": "c"})
+    assert res.json()["owner"]["email"] == new_email
+
+
+@pytest.mark.parametrize("user_id, status_code", [(None, 403), (666, 404)])
+def test_update_other_user_is_refused_before_hashing(
+    authorized_client, test_user2, monkeypatch, user_id, status_code
+):
+    async def fail_hash(password):
+        raise AssertionError("hashed the password of a refused update")
+
+    monkeypatch.setattr(users_api, "hash_password_async", fail_hash)
+
+    res = authorized_client.put(
+        f"/users/{user_id or test_user2['id']}",
+        json={"email": "other@email.com", "password": test_password},
+    )
+
+    assert res.status_code == status_code
+
+
+@pytest.mark.anyio
+async def test_current_user_racing_a_delete_is_not_cached(monkeypatch):
+    users_service.user_cache.clear()
+    token = oauth2_service.create_access_token({"user_id": 42})
+    user = UserOut(
+        id=42, email="racing@email.com", password="x", created_at=datetime.now()
+    )
+
+    async def racing_run_in_session(db_session, func, user_id):
+        # ? delete_user commits while the lookup's row is on its way back
+        users_service.user_cache.delete(user_id)
+        return user
+
+    monkeypatch.setattr(oauth2_service, "run_in_session", racing_run_in_session)
+
+    assert await oauth2_service.get_current_user(token, None) == user
+    assert users_service.user_cache.get(42) is None
+
+
+# 5 PASSWORD POOL
+
+
+@pytest.mark.anyio
+async def test_password_pool_hash_and_verify():
+    hashed_password = await password_utils.hash_password_async(test_password)
+
+    assert await password_utils.verify_password_async(test_password, hashed_password)
+    assert not await password_utils.verify_password_async("wrong", hashed_password)
+    assert password_utils.password_pool_stats()["queued"] == 0
+
+
+@pytest.mark.anyio
+async def test_password_pool_sheds_load_when_full(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_POOL_MAX_PENDING", 0)
+
+    with pytest.raises(ServiceUnavailableException):
+        await password_utils.hash_password_async(test_password)
+
+    assert password_utils.password_pool_stats()["rejected"] >= 1
@@ -1,11 +1,22 @@
+import asyncio
+import time
+from datetime import datetime
 import pytest
+from httpx import AsyncClient
+from app.authentication import oauth2_service
+from app.database.db_config import get_db, get_async_db
+from app.main import app
 from app.models.votes_model import VoteModel
+from app.schemas.users_schemas import UserOut
+from app.services import votes_service
 
 
 @pytest.fixture(name="test_vote")
 def test_vote(test_posts, session, test_user):
     new_vote = VoteModel(user_id=test_user["id"], post_id=test_posts[3].id)
     session.add(new_vote)
+    # ? Keep the denormalized counter consistent with the seeded vote
+    test_posts[3].vote_count += 1
     session.commit()
 
 
@@ -43,3 +54,74 @@ def test_delete_non_existing_vote(authorized_client, test_posts):
     res = authorized_client.post("/votes", json={"post_id": test_posts[3].id, "dir": 0})
 
     assert res.status_code == 404
+
+
+def test_vote_updates_post_vote_count(authorized_client, test_posts):
+    post_url = f"/posts/{test_posts[3].id}"
+    vote = {"post_id": test_posts[3].id}
+
+    authorized_client.post("/votes", json={**vote, "dir": 1})
+    assert authorized_client.get(post_url).json()["n_votes"] == 1
+
+    authorized_client.post("/votes", json={**vote, "dir": 0})
+    assert authorized_client.get(post_url).json()["n_votes"] == 0
+
+
+def test_deleting_voter_decrements_post_vote_count(
+    authorized_client, test_user, test_user2, test_posts
+):
+    post_url = f"/posts/{test_posts[3].id}"
+    authorized_client.post("/votes", json={"post_id": test_posts[3].id, "dir": 1})
+    # ? Caches the voted post and keeps its ETag
+    etag = authorized_client.get(post_url).headers["ETag"]
+
+    res = authorized_client.delete(f"/users/{test_user['id']}")
+    assert res.status_code == 204
+
+    token2 = oauth2_service.create_access_token({"user_id": test_user2["id"]})
+    authorized_client.headers["Authorization"] = f"Bearer {token2}"
+
+    res = authorized_client.get(post_url, headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.json()["n_votes"] == 0
+
+
+@pytest.mark.anyio
+async def test_slow_vote_does_not_block_event_loop(monkeypatch):
+    vote_delay = 0.5
+
+    def slow_create_or_delete_vote(db_session, vote, current_user):
+        time.sleep(vote_delay)
+        return None
+
+    fake_user = UserOut(
+        id=1, email="slow@email.com", password="hashed", created_at=datetime.now()
+    )
+    monkeypatch.setattr(
+        votes_service, "create_or_delete_vote", slow_create_or_delete_vote
+    )
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: None)
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, lambda: None)
+    monkeypatch.setitem(
+        app.dependency_overrides, oauth2_service.get_current_user, lambda: fake_user
+    )
+
+    async with AsyncClient(app=app, base_url="http://test") as async_client:
+        vote_request = asyncio.create_task(
+            async_client.post("/votes", json={"post_id": 1, "dir": 0})
+        )
+        await asyncio.sleep(0.05)
+
+        start = time.perf_counter()
+        res = await async_client.get("/")
+        elapsed = time.perf_counter() - start
+
+        # ? The vote is still sleeping, yet the other request was served meanwhile
+        assert not vote_request.done()
+        assert res.status_code == 200
+        assert elapsed < vote_delay
+
+        vote_res = await vote_request
+
+    assert vote_res.status_code == 204